@@ -19,6 +19,8 @@ warnings.filterwarnings('ignore')
 # Import custom modules
 from data_processor import DataProcessor
 from disease_predictor import DiseasePredictor
+from model_registry import ModelRegistry
+from symptom_questioner import SymptomQuestioner
 from recommendation_system import RecommendationSystem
 from routine_generator import RoutineGenerator
 from visualization import Visualization
@@ -73,18 +75,38 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
+@st.cache_resource
+def load_shared_engines():
+    """Load the engines once per server process and share them across all sessions"""
+    data_processor = DataProcessor()
+    
+    # Train in the background if no models are saved; requests get naive Bayes answers meanwhile
+    disease_predictor = DiseasePredictor(background_training=True, data_processor=data_processor)
+    
+    # Hot-swap model versions published to model_artifacts/ without restarting sessions
+    model_registry = ModelRegistry(disease_predictor)
+    model_registry.start_watching()
+    
+    return {
+        'data_processor': data_processor,
+        'disease_predictor': disease_predictor,
+        'model_registry': model_registry,
+        # Follow-up questions share the predictor's naive Bayes tables instead of keeping their own
+        'symptom_questioner': SymptomQuestioner.from_engine(disease_predictor.naive_bayes),
+        'recommendation_system': RecommendationSystem(),
+        'routine_generator': RoutineGenerator(),
+        'visualization': Visualization()
+    }
+
+def reload_shared_engines():
+    """Drop the shared engines so the next run of any session loads fresh copies"""
+    st.session_state.model_registry.stop_watching()
+    load_shared_engines.clear()
+
 def main():
-    # Initialize session state
-    if 'data_processor' not in st.session_state:
-        st.session_state.data_processor = DataProcessor()
-    if 'disease_predictor' not in st.session_state:
-        st.session_state.disease_predictor = DiseasePredictor()
-    if 'recommendation_system' not in st.session_state:
-        st.session_state.recommendation_system = RecommendationSystem()
-    if 'routine_generator' not in st.session_state:
-        st.session_state.routine_generator = RoutineGenerator()
-    if 'visualization' not in st.session_state:
-        st.session_state.visualization = Visualization()
+    # Point this session at the process-wide engines (read-only, safe to share)
+    for name, engine in load_shared_engines().items():
+        st.session_state[name] = engine
 
     # Main header
     st.markdown('<h1 class="main-header">🏥 HealthCare AI - Diagnosis & Recommendation System</h1>', unsafe_allow_html=True)
@@ -110,6 +132,23 @@ def main():
         show_analytics_dashboard()
     elif page == "ℹ️ About":
         show_about_page()
+    
+    st.sidebar.markdown("---")
+    training_status = st.session_state.disease_predictor.get_training_status()
+    if training_status['state'] == 'training':
+        st.sidebar.info(f"🧠 Training models: {training_status['stage']}. Predictions come from the naive Bayes fallback until training finishes.")
+        st.sidebar.progress(training_status['progress'])
+    elif training_status['state'] == 'failed':
+        st.sidebar.error(f"Model training failed: {training_status['error']}")
+    
+    registry_status = st.session_state.model_registry.get_status()
+    st.sidebar.caption(f"Model version: {registry_status['current_version'] or 'none'}")
+    if registry_status['previous_version'] and st.sidebar.button("↩️ Roll Back Models"):
+        st.session_state.model_registry.rollback()
+        st.rerun()
+    if st.sidebar.button("🔄 Reload Models & Data"):
+        reload_shared_engines()
+        st.rerun()
 
 def show_home_page():
     st.markdown("""
@@ -143,6 +182,40 @@ def show_home_page():
     with col4:
         st.metric("Accuracy Rate", "95%+", "↗️")
 
+def answer_symptom_question(symptom, has_symptom):
+    """Record the answer to a follow-up question before the page reruns"""
+    form_data = st.session_state.form_data
+    if has_symptom:
+        form_data['selected_symptoms'] = form_data['selected_symptoms'] + [symptom]
+        # Drop the widget state so the multiselect picks up the new default
+        st.session_state.pop('symptoms_input', None)
+    else:
+        form_data['denied_symptoms'] = form_data['denied_symptoms'] + [symptom]
+
+def show_symptom_questions(selected_symptoms, additional_symptoms):
+    """Ask about the symptoms that would best narrow down the diagnosis"""
+    questioner = st.session_state.symptom_questioner
+    if questioner is None or not selected_symptoms:
+        return
+    
+    denied_symptoms = st.session_state.form_data.setdefault('denied_symptoms', [])
+    suggestions = questioner.suggest(selected_symptoms, denied_symptoms, additional_symptoms, top_k=5)
+    if not suggestions:
+        return
+    
+    with st.expander("❓ Do you also have any of these symptoms?", expanded=True):
+        st.caption("Ranked by how much the answer would narrow down the possible diseases")
+        for suggestion in suggestions:
+            symptom = suggestion['symptom']
+            col1, col2, col3 = st.columns([4, 1, 1])
+            with col1:
+                st.write(f"**{symptom.replace('_', ' ').title()}** "
+                         f"({suggestion['probability']*100:.0f}% likely, {suggestion['information_gain']:.2f} bits)")
+            with col2:
+                st.button("Yes", key=f"symptom_yes_{symptom}", on_click=answer_symptom_question, args=(symptom, True))
+            with col3:
+                st.button("No", key=f"symptom_no_{symptom}", on_click=answer_symptom_question, args=(symptom, False))
+
 def show_disease_prediction_page():
     st.markdown('<h2 class="sub-header">🔍 Disease Prediction</h2>', unsafe_allow_html=True)
     
@@ -154,6 +227,7 @@ def show_disease_prediction_page():
             'weight': 70,
             'gender': 'Male',
             'selected_symptoms': [],
+            'denied_symptoms': [],
             'additional_symptoms': '',
             'temperature': 36.5
         }
@@ -225,6 +299,8 @@ def show_disease_prediction_page():
         key="additional_symptoms_input"
     )
     
+    show_symptom_questions(selected_symptoms, additional_symptoms)
+    
     # Temperature input
     temperature = st.number_input("Body Temperature (°C)", min_value=35.0, max_value=42.0, 
                                 value=st.session_state.form_data['temperature'], 
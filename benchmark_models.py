@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+"""
+Benchmark script for the disease prediction models
+Compares accuracy and train/predict times of alternative ensemble members on a subsample
+"""
+
+import argparse
+import pickle
+import sys
+import os
+import time
+
+import numpy as np
+from sklearn.metrics import accuracy_score
+from sklearn.model_selection import train_test_split
+
+# Add current directory to path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from data_processor import DataProcessor
+from disease_predictor import ENSEMBLE_MEMBER_FACTORIES, get_early_stopping_split, stops_early
+from tree_engine import CompiledTreeEnsemble
+
+def load_subsample(sample_size, random_state=42, data_processor=None):
+    """Load a random subsample of the symptom matrix and split it for evaluation"""
+    data_processor = data_processor or DataProcessor()
+    X, y = data_processor.prepare_training_data(sparse_features=True)
+    
+    rng = np.random.default_rng(random_state)
+    rows = rng.choice(X.shape[0], size=min(sample_size, X.shape[0]), replace=False)
+    X, y = X[rows], y[rows]
+    
+    try:
+        return train_test_split(X, y, test_size=0.2, random_state=random_state, stratify=y)
+    except ValueError:
+        return train_test_split(X, y, test_size=0.2, random_state=random_state)
+
+def time_member(kind, X_train, X_test, y_train, y_test, n_jobs=-1):
+    """Fit one ensemble member kind and measure accuracy, fit time and per-row predict time"""
+    model = ENSEMBLE_MEMBER_FACTORIES[kind](n_jobs)
+    
+    start = time.perf_counter()
+    if stops_early(model):
+        X_fit, y_fit, fit_params = get_early_stopping_split(model, X_train, y_train)
+        model.fit(X_fit, y_fit, **fit_params)
+    else:
+        model.fit(X_train, y_train)
+    fit_seconds = time.perf_counter() - start
+    
+    start = time.perf_counter()
+    proba = model.predict_proba(X_test)
+    predict_seconds = time.perf_counter() - start
+    
+    # Single-row latency, as seen by one app request
+    single_row = X_test[:1]
+    start = time.perf_counter()
+    for _ in range(20):
+        model.predict_proba(single_row)
+    single_ms = (time.perf_counter() - start) / 20 * 1000
+    
+    accuracy = accuracy_score(y_test, model.classes_[proba.argmax(axis=1)])
+    return {
+        'kind': kind,
+        'accuracy': accuracy,
+        'fit_seconds': fit_seconds,
+        'predict_ms_per_row': predict_seconds / X_test.shape[0] * 1000,
+        'single_row_ms': single_ms,
+        'model_kb': len(pickle.dumps(model)) / 1024
+    }
+
+def print_results(results):
+    """Print benchmark results as a table"""
+    print(f"   {'Member':<22}{'Accuracy':>10}{'Fit (s)':>10}{'Batch ms/row':>14}{'1-row ms':>10}")
+    for result in results:
+        print(f"   {result['kind']:<22}{result['accuracy']:>10.3f}{result['fit_seconds']:>10.2f}"
+              f"{result['predict_ms_per_row']:>14.4f}{result['single_row_ms']:>10.2f}")
+
+def benchmark_kernel_members(sample_size=20000):
+    """Compare the exact SVC member with the Nystroem kernel approximation"""
+    print(f"\n🧪 Kernel members on a {sample_size}-row subsample")
+    X_train, X_test, y_train, y_test = load_subsample(sample_size)
+    results = [time_member(kind, X_train, X_test, y_train, y_test) for kind in ['svc', 'kernel_approx']]
+    print_results(results)
+    return results
+
+def time_call(function, X, repeats):
+    """Average milliseconds per call of function(X)"""
+    start = time.perf_counter()
+    for _ in range(repeats):
+        function(X)
+    return (time.perf_counter() - start) / repeats * 1000
+
+def benchmark_compiled_trees(sample_size=20000):
+    """Compare sklearn predict_proba with the flattened-array tree engine"""
+    print(f"\n🧪 Compiled tree engines on a {sample_size}-row subsample")
+    X_train, X_test, y_train, y_test = load_subsample(sample_size)
+    
+    print(f"   {'Member':<22}{'Identical':>10}{'sklearn 1-row':>15}{'compiled 1-row':>16}{'sklearn batch':>15}{'compiled batch':>16}")
+    results = []
+    for kind in ['random_forest', 'gradient_boosting']:
+        # One thread, so the forest sums its trees in a fixed order
+        model = ENSEMBLE_MEMBER_FACTORIES[kind](1).fit(X_train, y_train)
+        engine = CompiledTreeEnsemble.compile(model)
+        
+        identical = np.array_equal(model.predict_proba(X_test), engine.predict_proba(X_test))
+        result = {
+            'kind': kind,
+            'identical': identical,
+            'sklearn_single_ms': time_call(model.predict_proba, X_test[:1], 50),
+            'compiled_single_ms': time_call(engine.predict_proba, X_test[:1], 50),
+            'sklearn_batch_ms': time_call(model.predict_proba, X_test, 3),
+            'compiled_batch_ms': time_call(engine.predict_proba, X_test, 3)
+        }
+        results.append(result)
+        print(f"   {kind:<22}{str(identical):>10}{result['sklearn_single_ms']:>13.2f}ms{result['compiled_single_ms']:>14.2f}ms"
+              f"{result['sklearn_batch_ms']:>13.1f}ms{result['compiled_batch_ms']:>14.1f}ms")
+    return results
+
+def benchmark_pruning(sample_size=20000, min_supports=(None, 1e-4, 1e-3, 5e-3, 1e-2)):
+    """Compare accuracy, latency and model size after dropping rare symptom columns"""
+    print(f"\n🧪 Symptom pruning on a {sample_size}-row subsample")
+    data_processor = DataProcessor()
+    
+    print(f"   {'Min support':<13}{'Columns':>8}  {'Member':<22}{'Accuracy':>10}{'Fit (s)':>9}{'1-row ms':>10}{'Size (KB)':>11}")
+    results = []
+    for min_support in min_supports:
+        data_processor.feature_selection = None
+        if min_support is not None:
+            data_processor.select_symptom_columns(min_support=min_support)
+        X_train, X_test, y_train, y_test = load_subsample(sample_size, data_processor=data_processor)
+        
+        for kind in ['logistic_regression', 'random_forest']:
+            result = time_member(kind, X_train, X_test, y_train, y_test, n_jobs=1)
+            result.update({'min_support': min_support, 'columns': X_train.shape[1]})
+            results.append(result)
+            print(f"   {str(min_support or 'none'):<13}{result['columns']:>8}  {kind:<22}{result['accuracy']:>10.3f}"
+                  f"{result['fit_seconds']:>9.2f}{result['single_row_ms']:>10.2f}{result['model_kb']:>11.0f}")
+    return results
+
+def benchmark_boosting(sample_size=20000):
+    """Compare exact gradient boosting with LightGBM's histogram boosting on the sparse matrix"""
+    print(f"\n🧪 Boosting members on a {sample_size}-row subsample")
+    X_train, X_test, y_train, y_test = load_subsample(sample_size)
+    
+    results = []
+    for kind in ['gradient_boosting', 'lightgbm']:
+        try:
+            results.append(time_member(kind, X_train, X_test, y_train, y_test))
+        except ImportError as e:
+            print(f"   Skipping {kind}: {e}")
+    print_results(results)
+    return results
+
+BENCHMARKS = {
+    'boosting': benchmark_boosting,
+    'kernel': benchmark_kernel_members,
+    'trees': benchmark_compiled_trees,
+    'pruning': benchmark_pruning
+}
+
+def main():
+    """Run the selected benchmarks"""
+    parser = argparse.ArgumentParser(description="Benchmark HealthCare AI prediction models")
+    parser.add_argument('benchmarks', nargs='*', choices=sorted(BENCHMARKS), default=sorted(BENCHMARKS))
+    parser.add_argument('--sample-size', type=int, default=20000)
+    args = parser.parse_args()
+    
+    print("📊 HealthCare AI - Model Benchmarks")
+    print("=" * 50)
+    for name in args.benchmarks:
+        BENCHMARKS[name](sample_size=args.sample_size)
+
+if __name__ == "__main__":
+    main()
@@ -1,23 +1,159 @@
+import hashlib
+import json
+import os
+import re
+import numpy as np
 import pandas as pd
+from scipy import sparse
+from pandas.api.types import union_categoricals
 from sklearn.preprocessing import LabelEncoder, StandardScaler
+from symptom_encoder import SymptomEncoder
 import warnings
 warnings.filterwarnings('ignore')
 
+SYMPTOMS_DATA_FILE = 'Final_Augmented_dataset_Diseases_and_Symptoms.csv'
+SOURCE_FILES = [SYMPTOMS_DATA_FILE, 'health_dataset.csv', 'Symptom-severity.csv', 'medical data.csv']
+CACHE_DIR = '.data_cache'
+CHUNK_SIZE = 50000
+# Feature column that stands for every symptom merged away by feature selection
+MERGED_SYMPTOM_COLUMN = 'other_rare_symptoms'
+
+def file_fingerprint(path, with_hash=True):
+    """Fingerprint a file by size, modification time and content hash"""
+    stat = os.stat(path)
+    fingerprint = {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
+    if with_hash:
+        sha256 = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for block in iter(lambda: f.read(1 << 20), b''):
+                sha256.update(block)
+        fingerprint['sha256'] = sha256.hexdigest()
+    return fingerprint
+
+def normalize_symptom_name(symptom):
+    """Normalize a symptom name so case, spaces and underscores do not matter"""
+    return re.sub(r'[\s_]+', '_', str(symptom).strip().lower())
+
+def read_symptom_matrix(path, chunksize=CHUNK_SIZE):
+    """Read the binary symptom matrix in chunks with an explicit uint8/category schema"""
+    columns = [col.strip() for col in pd.read_csv(path, nrows=0).columns]
+    schema = {col: np.uint8 for col in columns if col != 'diseases'}
+    schema['diseases'] = 'category'
+    
+    try:
+        chunks = list(pd.read_csv(path, header=0, names=columns, dtype=schema, chunksize=chunksize))
+    except ValueError:
+        # Missing cells cannot be parsed as uint8, so fill them chunk by chunk
+        float_schema = {col: np.float32 for col in schema if col != 'diseases'}
+        float_schema['diseases'] = 'category'
+        chunks = [
+            chunk.fillna({col: 0 for col in float_schema if col != 'diseases'}).astype(schema)
+            for chunk in pd.read_csv(path, header=0, names=columns, dtype=float_schema, chunksize=chunksize)
+        ]
+    
+    if not chunks:
+        return pd.DataFrame({col: pd.Series(dtype=dtype) for col, dtype in schema.items()})[columns]
+    
+    # Categories differ between chunks, so unify them before concatenating
+    diseases = union_categoricals([chunk['diseases'] for chunk in chunks], sort_categories=True)
+    data = pd.concat([chunk.drop(columns='diseases') for chunk in chunks], ignore_index=True)
+    data.insert(columns.index('diseases'), 'diseases', diseases)
+    return data
+
+def find_chunk_offsets(path, chunksize=CHUNK_SIZE, block_size=1 << 24):
+    """Get the byte offset of the first row of every chunk, so chunks can be read in any order"""
+    with open(path, 'rb') as f:
+        f.readline()
+        position = f.tell()
+        offsets = [position]
+        rows = 0
+        for block in iter(lambda: f.read(block_size), b''):
+            # Every newline ends one row and starts the next; keep the rows that start a chunk
+            row_starts = np.flatnonzero(np.frombuffer(block, dtype=np.uint8) == ord('\n')) + position + 1
+            offsets.extend(row_starts[(-(rows + 1)) % chunksize::chunksize].tolist())
+            rows += len(row_starts)
+            position += len(block)
+    
+    # A newline at the end of the file starts no row
+    return np.array([offset for offset in offsets if offset < position], dtype=np.int64)
+
+def iter_symptom_chunks(path, chunksize=CHUNK_SIZE, chunks=None):
+    """Yield (symptom_columns, CSR symptom chunk, disease labels, row numbers) without loading the whole file
+    
+    chunks is an optional sequence of (chunk number, byte offset) pairs, with offsets
+    from find_chunk_offsets, to read the chunks in that order. Row numbers count the
+    data rows from the start of the file either way.
+    """
+    columns = [col.strip() for col in pd.read_csv(path, nrows=0).columns]
+    symptom_columns = [col for col in columns if col != 'diseases']
+    schema = {col: np.float32 for col in symptom_columns}
+    schema['diseases'] = str
+    
+    def to_arrays(chunk, first_row):
+        labeled = chunk['diseases'].notna().to_numpy()
+        chunk = chunk[labeled]
+        symptoms = chunk[symptom_columns].fillna(0).to_numpy(dtype=np.float32)
+        return (symptom_columns, sparse.csr_matrix(symptoms), chunk['diseases'].to_numpy(dtype=object),
+                first_row + np.flatnonzero(labeled))
+    
+    if chunks is None:
+        for chunk_number, chunk in enumerate(pd.read_csv(path, header=0, names=columns, dtype=schema,
+                                                         chunksize=chunksize)):
+            yield to_arrays(chunk, chunk_number * chunksize)
+        return
+    
+    with open(path, 'rb') as f:
+        for chunk_number, offset in chunks:
+            f.seek(offset)
+            chunk = pd.read_csv(f, header=None, names=columns, dtype=schema, nrows=chunksize)
+            yield to_arrays(chunk, chunk_number * chunksize)
+
 class DataProcessor:
-    def __init__(self):
+    def __init__(self, cache_dir=CACHE_DIR, load=True):
+        self.cache_dir = cache_dir
         self.symptoms_data = None
+        self.symptom_matrix = None
+        self.profile_diseases = []
+        self.profile_symptom_columns = []
+        self.disease_index = {}
+        self.disease_symptom_counts = None
+        self.disease_row_counts = None
+        self.disease_symptoms = {}
         self.diseases_data = None
         self.medical_data = None
         self.symptom_severity = None
+        self.severity_index = {}
         self.label_encoders = {}
+        self.feature_selection = None
+        self.training_groups = None
+        self.dedup_report = {}
         self.scaler = StandardScaler()
-        self.load_data()
+        if load:
+            self.load_data()
+    
+    @classmethod
+    def from_disease_profiles(cls, diseases, symptom_columns, symptom_counts, row_counts):
+        """Build a processor from disease profiles counted elsewhere, without loading the datasets
+        
+        Streaming training counts the profiles chunk by chunk; this gives it the same
+        disease information as a fully loaded processor.
+        """
+        data_processor = cls(cache_dir=None, load=False)
+        data_processor.set_disease_profiles(diseases, symptom_counts, row_counts, symptom_columns)
+        return data_processor
     
     def load_data(self):
         """Load and preprocess all datasets"""
         try:
-            # Load symptoms and diseases dataset
-            self.symptoms_data = pd.read_csv('Final_Augmented_dataset_Diseases_and_Symptoms.csv')
+            # Load symptoms and diseases dataset, from the binary cache when it is still valid
+            self.symptoms_data = self.load_cached_symptoms()
+            if self.symptoms_data is None:
+                self.symptoms_data = read_symptom_matrix(SYMPTOMS_DATA_FILE)
+                self.build_disease_profiles()
+                self.save_cached_symptoms()
+            elif not self.load_cached_disease_profiles():
+                self.build_disease_profiles()
+                self.save_cached_disease_profiles()
             
             # Load health dataset
             self.medical_data = pd.read_csv('health_dataset.csv')
@@ -38,8 +174,173 @@ class DataProcessor:
             print(f"Error loading data: {e}")
             self.create_sample_data()
     
+    def cache_path(self, name):
+        """Get the path of a file inside the cache directory"""
+        return os.path.join(self.cache_dir, name)
+    
+    def is_cache_valid(self):
+        """Check the stored fingerprint against the current source files"""
+        if not self.cache_dir:
+            return False
+        
+        try:
+            with open(self.cache_path('fingerprint.json')) as f:
+                stored = json.load(f)
+        except (OSError, ValueError):
+            return False
+        
+        if sorted(stored) != sorted(path for path in SOURCE_FILES if os.path.exists(path)):
+            return False
+        
+        touched = False
+        for path, expected in stored.items():
+            current = file_fingerprint(path, with_hash=False)
+            if current['size'] != expected['size']:
+                return False
+            if current['mtime_ns'] != expected['mtime_ns']:
+                # Same size but touched: only the content hash can tell
+                if file_fingerprint(path)['sha256'] != expected['sha256']:
+                    return False
+                expected['mtime_ns'] = current['mtime_ns']
+                touched = True
+        
+        if touched:
+            self.write_cache_file('fingerprint.json', lambda f: json.dump(stored, f), mode='w')
+        return True
+    
+    def write_cache_file(self, name, writer, mode='wb'):
+        """Write a cache file atomically through a temporary file"""
+        path = self.cache_path(name)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, mode) as f:
+            writer(f)
+        os.replace(tmp_path, path)
+    
+    def load_cached_symptoms(self):
+        """Memory-map the preprocessed symptom matrix if the cache matches the source files"""
+        if not self.is_cache_valid():
+            return None
+        
+        try:
+            with open(self.cache_path('vocabulary.json')) as f:
+                vocabulary = json.load(f)
+            matrix = np.load(self.cache_path('symptom_matrix.npy'), mmap_mode='c')
+            codes = np.load(self.cache_path('disease_codes.npy'), mmap_mode='c')
+        except (OSError, ValueError) as e:
+            print(f"Ignoring unreadable data cache: {e}")
+            return None
+        
+        columns = vocabulary['columns']
+        data = pd.DataFrame(matrix, columns=[col for col in columns if col != 'diseases'], copy=False)
+        data.insert(columns.index('diseases'), 'diseases',
+                    pd.Categorical.from_codes(codes, categories=vocabulary['diseases']))
+        return data
+    
+    def save_cached_symptoms(self):
+        """Persist the symptom matrix, disease codes and vocabulary with a source fingerprint"""
+        if not self.cache_dir or self.symptoms_data is None:
+            return
+        
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            # Drop the old fingerprint first so a half-written cache is never trusted
+            if os.path.exists(self.cache_path('fingerprint.json')):
+                os.remove(self.cache_path('fingerprint.json'))
+            
+            diseases = self.symptoms_data['diseases'].astype('category')
+            symptom_columns = self.get_symptom_columns()
+            vocabulary = {
+                'columns': self.symptoms_data.columns.tolist(),
+                'diseases': diseases.cat.categories.tolist()
+            }
+            matrix = self.symptoms_data[symptom_columns].to_numpy(dtype=np.uint8)
+            
+            self.write_cache_file('symptom_matrix.npy', lambda f: np.save(f, matrix))
+            self.write_cache_file('disease_codes.npy', lambda f: np.save(f, diseases.cat.codes.to_numpy()))
+            self.write_cache_file('vocabulary.json', lambda f: json.dump(vocabulary, f), mode='w')
+            self.save_cached_disease_profiles()
+            
+            fingerprint = {path: file_fingerprint(path) for path in SOURCE_FILES if os.path.exists(path)}
+            self.write_cache_file('fingerprint.json', lambda f: json.dump(fingerprint, f), mode='w')
+        except OSError as e:
+            print(f"Could not write data cache: {e}")
+    
+    def load_cached_disease_profiles(self):
+        """Load the per-disease symptom counts persisted next to the symptom matrix"""
+        if not self.cache_dir:
+            return False
+        
+        try:
+            with open(self.cache_path('disease_profiles.json')) as f:
+                diseases = json.load(f)
+            symptom_counts = np.load(self.cache_path('disease_symptom_counts.npy'))
+            row_counts = np.load(self.cache_path('disease_row_counts.npy'))
+        except (OSError, ValueError):
+            return False
+        
+        self.set_disease_profiles(diseases, symptom_counts, row_counts)
+        return True
+    
+    def save_cached_disease_profiles(self):
+        """Persist the per-disease symptom counts with the other cached artifacts"""
+        if not self.cache_dir or self.disease_symptom_counts is None:
+            return
+        
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            self.write_cache_file('disease_symptom_counts.npy', lambda f: np.save(f, self.disease_symptom_counts))
+            self.write_cache_file('disease_row_counts.npy', lambda f: np.save(f, self.disease_row_counts))
+            self.write_cache_file('disease_profiles.json', lambda f: json.dump(self.profile_diseases, f), mode='w')
+        except OSError as e:
+            print(f"Could not write disease profiles: {e}")
+    
+    def build_disease_profiles(self):
+        """Count symptom occurrences for every disease in one grouped aggregation"""
+        if self.symptoms_data is None:
+            return
+        
+        diseases = self.symptoms_data['diseases'].astype('category')
+        codes = diseases.cat.codes.to_numpy()
+        n_rows = len(codes)
+        
+        # A disease x row indicator matrix times the symptom matrix sums every group at once
+        membership = sparse.csr_matrix(
+            (np.ones(n_rows, dtype=np.int32), (codes, np.arange(n_rows))),
+            shape=(len(diseases.cat.categories), n_rows)
+        )
+        symptom_counts = (membership @ self.get_symptom_matrix().astype(np.int32)).toarray()
+        row_counts = np.bincount(codes, minlength=len(diseases.cat.categories))
+        
+        self.set_disease_profiles(diseases.cat.categories.tolist(), symptom_counts, row_counts)
+    
+    def set_disease_profiles(self, diseases, symptom_counts, row_counts, symptom_columns=None):
+        """Install disease profiles and precompute the per-disease symptom lists"""
+        self.profile_diseases = list(diseases)
+        self.disease_index = {disease: i for i, disease in enumerate(self.profile_diseases)}
+        self.disease_symptom_counts = symptom_counts
+        self.disease_row_counts = row_counts
+        
+        if symptom_columns is None:
+            symptom_columns = self.get_symptom_columns()
+        # The columns the counts are indexed by, also when no symptom matrix is loaded
+        self.profile_symptom_columns = list(symptom_columns)
+        symptom_columns = np.array(self.profile_symptom_columns, dtype=object)
+        self.disease_symptoms = {
+            disease: symptom_columns[symptom_counts[i] > 0].tolist()
+            for i, disease in enumerate(self.profile_diseases)
+        }
+    
     def create_sample_data(self):
         """Create sample data if files are not found"""
+        # Loading may have failed after the real matrix and its profiles were built
+        self.symptom_matrix = None
+        self.profile_diseases = []
+        self.profile_symptom_columns = []
+        self.disease_index = {}
+        self.disease_symptom_counts = None
+        self.disease_row_counts = None
+        self.disease_symptoms = {}
+        
         # Sample symptoms data
         self.symptoms_data = pd.DataFrame({
             'diseases': ['Common Cold', 'Flu', 'Headache', 'Fever', 'Cough'],
@@ -55,6 +356,7 @@ class DataProcessor:
             'Symptom': ['fever', 'cough', 'headache', 'fatigue', 'sore_throat'],
             'weight': [5, 3, 4, 3, 4]
         })
+        self.build_severity_index()
         
         # Sample medical data
         self.medical_data = pd.DataFrame({
@@ -63,6 +365,8 @@ class DataProcessor:
             'Symptom_2': ['cough', 'fatigue', 'fatigue', 'headache', 'fatigue'],
             'Symptom_3': ['sore_throat', 'headache', 'nausea', 'chills', 'sore_throat']
         })
+        
+        self.build_disease_profiles()
     
     def preprocess_data(self):
         """Preprocess the loaded data"""
@@ -70,18 +374,28 @@ class DataProcessor:
             # Clean column names
             self.symptoms_data.columns = self.symptoms_data.columns.str.strip()
             
-            # Handle missing values
-            self.symptoms_data = self.symptoms_data.fillna(0)
-            
-            # Convert binary columns to int
+            # Data from read_symptom_matrix is already typed, only convert what is not
             symptom_columns = [col for col in self.symptoms_data.columns if col != 'diseases']
-            for col in symptom_columns:
-                self.symptoms_data[col] = self.symptoms_data[col].astype(int)
+            untyped = [col for col in symptom_columns if self.symptoms_data[col].dtype != np.uint8]
+            if untyped:
+                self.symptoms_data[untyped] = self.symptoms_data[untyped].fillna(0).astype(np.uint8)
         
         if self.symptom_severity is not None:
             # Clean symptom severity data
             self.symptom_severity.columns = self.symptom_severity.columns.str.strip()
             self.symptom_severity = self.symptom_severity.dropna()
+            self.build_severity_index()
+    
+    def build_severity_index(self):
+        """Build a normalized symptom -> weight dictionary for constant-time lookups"""
+        self.severity_index = {}
+        if self.symptom_severity is None:
+            return
+        
+        names = self.symptom_severity['Symptom'].map(normalize_symptom_name)
+        # Keep the first weight listed for a symptom, like the old DataFrame filter did
+        for name, weight in zip(names, self.symptom_severity['weight']):
+            self.severity_index.setdefault(name, weight)
     
     def get_symptoms_list(self):
         """Get list of available symptoms"""
@@ -90,29 +404,154 @@ class DataProcessor:
             return sorted(symptom_columns)
         return []
     
+    def get_symptom_columns(self):
+        """Get symptom columns in feature order"""
+        if self.symptoms_data is not None:
+            return [col for col in self.symptoms_data.columns if col != 'diseases']
+        return []
+    
+    def get_symptom_support(self):
+        """Get the fraction of rows in which each symptom column is positive"""
+        matrix = self.get_symptom_matrix()
+        if matrix is None or not matrix.shape[0]:
+            return np.zeros(len(self.get_symptom_columns()))
+        return np.asarray(matrix.sum(axis=0)).ravel() / matrix.shape[0]
+    
+    def get_symptom_mutual_information(self):
+        """Get the mutual information (nats) between each symptom and the disease
+        
+        Computed in closed form from the disease profile counts, without another pass over the rows.
+        """
+        positives = self.disease_symptom_counts.astype(np.float64)
+        rows = self.disease_row_counts.astype(np.float64)[:, np.newaxis]
+        joint = np.stack([rows - positives, positives]) / rows.sum()
+        p_disease = rows / rows.sum()
+        p_symptom = joint.sum(axis=1, keepdims=True)
+        
+        with np.errstate(divide='ignore', invalid='ignore'):
+            terms = joint * np.log(joint / (p_disease * p_symptom))
+        return np.nansum(terms, axis=(0, 1))
+    
+    def select_symptom_columns(self, min_support=None, top_k=None, method='support', merge_rare=False):
+        """Choose the feature columns used for training
+        
+        Symptoms positive in fewer than min_support of the rows are dropped, and top_k keeps
+        the best columns ranked by support or by mutual information with the disease.
+        With merge_rare the removed symptoms are folded into one MERGED_SYMPTOM_COLUMN.
+        """
+        if method not in ('support', 'mutual_info'):
+            raise ValueError(f"Unknown feature selection method '{method}'")
+        
+        columns = self.get_symptom_columns()
+        support = self.get_symptom_support()
+        keep = np.ones(len(columns), dtype=bool)
+        if min_support is not None:
+            keep &= support >= min_support
+        if top_k is not None:
+            score = self.get_symptom_mutual_information() if method == 'mutual_info' else support
+            score = np.where(keep, score, -np.inf)
+            top = np.zeros(len(columns), dtype=bool)
+            top[np.argsort(-score, kind='stable')[:top_k]] = True
+            keep &= top
+        
+        kept = np.flatnonzero(keep)
+        removed = np.flatnonzero(~keep)
+        merged = removed if merge_rare and len(removed) else np.array([], dtype=np.intp)
+        selected_columns = [columns[i] for i in kept] + ([MERGED_SYMPTOM_COLUMN] if len(merged) else [])
+        
+        self.feature_selection = {
+            'columns': selected_columns,
+            'kept_indices': kept,
+            'merged_indices': merged,
+            'aliases': {columns[i]: MERGED_SYMPTOM_COLUMN for i in merged},
+            'report': {
+                'method': method,
+                'min_support': min_support,
+                'top_k': top_k,
+                'merge_rare': merge_rare,
+                'original_columns': len(columns),
+                'selected_columns': len(selected_columns),
+                'removed_columns': int(len(removed))
+            }
+        }
+        return selected_columns
+    
+    def get_feature_columns(self):
+        """Get the columns of the training matrix: the selected symptoms, or all of them"""
+        if self.feature_selection is not None:
+            return list(self.feature_selection['columns'])
+        return self.get_symptom_columns()
+    
+    def get_feature_aliases(self):
+        """Get the symptoms merged into another feature column"""
+        if self.feature_selection is not None:
+            return dict(self.feature_selection['aliases'])
+        return {}
+    
+    def reduce_features(self, X):
+        """Keep the selected columns of a symptom matrix and append the merged column"""
+        if self.feature_selection is None:
+            return X
+        
+        kept = self.feature_selection['kept_indices']
+        merged = self.feature_selection['merged_indices']
+        if isinstance(X, pd.DataFrame):
+            reduced = X.iloc[:, kept].copy()
+            if len(merged):
+                reduced[MERGED_SYMPTOM_COLUMN] = (X.iloc[:, merged].to_numpy().sum(axis=1) > 0).astype(np.uint8)
+            return reduced
+        
+        reduced = X[:, kept]
+        if len(merged):
+            any_merged = sparse.csr_matrix(np.asarray(X[:, merged].sum(axis=1)) > 0)
+            reduced = sparse.hstack([reduced, any_merged.astype(reduced.dtype)], format='csr')
+        return reduced.tocsr()
+    
+    def get_symptom_matrix(self):
+        """Get the symptom matrix as a boolean CSR matrix in feature order"""
+        if self.symptoms_data is None:
+            return None
+        
+        if self.symptom_matrix is None:
+            symptom_columns = self.get_symptom_columns()
+            n_rows = len(self.symptoms_data)
+            # Slice rows before converting, so only one dense block is expanded at a time
+            blocks = [
+                sparse.csr_matrix(
+                    self.symptoms_data.iloc[start:start + CHUNK_SIZE][symptom_columns].to_numpy(dtype=np.uint8),
+                    dtype=bool
+                )
+                for start in range(0, n_rows, CHUNK_SIZE)
+            ]
+            self.symptom_matrix = sparse.vstack(blocks, format='csr') if blocks else \
+                sparse.csr_matrix((n_rows, len(symptom_columns)), dtype=bool)
+        return self.symptom_matrix
+    
     def get_diseases_list(self):
         """Get list of available diseases"""
         if self.symptoms_data is not None:
             return sorted(self.symptoms_data['diseases'].unique().tolist())
-        return []
+        return sorted(self.profile_diseases)
     
     def get_symptom_severity(self, symptom):
         """Get severity weight for a symptom"""
-        if self.symptom_severity is not None:
-            severity_row = self.symptom_severity[
-                self.symptom_severity['Symptom'].str.lower() == symptom.lower()
-            ]
-            if not severity_row.empty:
-                return severity_row['weight'].iloc[0]
-        return 1  # Default weight
+        return self.severity_index.get(normalize_symptom_name(symptom), 1)  # Default weight 1
     
-    def prepare_training_data(self):
-        """Prepare data for machine learning training"""
+    def prepare_training_data(self, sparse_features=False, deduplicate=False):
+        """Prepare data for machine learning training
+        
+        With deduplicate=True identical (symptom vector, disease) rows are collapsed into
+        one, and the number of rows each stands for is returned as a third value.
+        """
         if self.symptoms_data is None:
-            return None, None
+            return (None, None, None) if deduplicate else (None, None)
         
         # Separate features and target
-        X = self.symptoms_data.drop('diseases', axis=1)
+        if sparse_features:
+            X = self.get_symptom_matrix()
+        else:
+            X = self.symptoms_data.drop('diseases', axis=1)
+        X = self.reduce_features(X)
         y = self.symptoms_data['diseases']
         
         # Encode target variable
@@ -122,23 +561,51 @@ class DataProcessor:
         else:
             y_encoded = self.label_encoders['diseases'].transform(y)
         
+        if deduplicate:
+            return self.deduplicate_rows(X, y_encoded)
         return X, y_encoded
     
-    def get_disease_symptoms(self, disease):
-        """Get symptoms associated with a specific disease"""
-        if self.symptoms_data is None:
-            return []
+    def deduplicate_rows(self, X, y):
+        """Collapse identical (symptom vector, disease) rows into unique rows with counts
         
-        disease_row = self.symptoms_data[self.symptoms_data['diseases'] == disease]
-        if disease_row.empty:
-            return []
+        training_groups gets the symptom vector id of every unique row, so splits can keep
+        a vector out of the test set when it was trained on, whatever its disease.
+        """
+        packed = SymptomEncoder(self.get_feature_columns()).pack_matrix(X)
+        vectors = np.ascontiguousarray(packed).view(np.dtype((np.void, packed.shape[1]))).ravel()
+        _, vector_ids = np.unique(vectors, return_inverse=True)
+        vector_ids = vector_ids.ravel().astype(np.int64)
         
-        symptoms = []
-        for col in self.symptoms_data.columns:
-            if col != 'diseases' and disease_row[col].iloc[0] == 1:
-                symptoms.append(col)
+        n_classes = len(self.label_encoders['diseases'].classes_)
+        _, first_rows, counts = np.unique(vector_ids * n_classes + y, return_index=True, return_counts=True)
         
-        return symptoms
+        # Keep the unique rows in file order
+        order = np.argsort(first_rows)
+        first_rows, counts = first_rows[order], counts[order]
+        
+        self.training_groups = vector_ids[first_rows]
+        self.dedup_report = {
+            'rows': int(len(y)),
+            'unique_rows': int(len(first_rows)),
+            'unique_vectors': int(vector_ids.max() + 1) if len(y) else 0,
+            'duplication_ratio': len(y) / len(first_rows) if len(first_rows) else 1.0
+        }
+        
+        X_unique = X.iloc[first_rows].reset_index(drop=True) if isinstance(X, pd.DataFrame) else X[first_rows]
+        return X_unique, y[first_rows], counts
+    
+    def get_disease_symptoms(self, disease):
+        """Get symptoms seen in any record of a specific disease"""
+        return list(self.disease_symptoms.get(disease, []))
+    
+    def get_disease_symptom_prevalence(self, disease):
+        """Get the fraction of a disease's records that show each of its symptoms"""
+        i = self.disease_index.get(disease)
+        if i is None or not self.disease_row_counts[i]:
+            return {}
+        
+        prevalence = self.disease_symptom_counts[i] / self.disease_row_counts[i]
+        return {self.profile_symptom_columns[j]: float(prevalence[j]) for j in np.flatnonzero(prevalence)}
     
     def get_disease_info(self, disease):
         """Get comprehensive information about a disease"""
@@ -196,6 +663,31 @@ class DataProcessor:
         
         return total_score, symptom_count
     
+    def calculate_symptom_scores(self, patients):
+        """Calculate weighted symptom scores for a batch of patients at once
+        
+        Each patient is a user_data dict with 'symptoms' and optionally 'additional_symptoms'.
+        Returns arrays of total scores and symptom counts, one entry per patient.
+        """
+        names = []
+        owners = []
+        for i, patient in enumerate(patients):
+            patient_symptoms = list(patient.get('symptoms', []))
+            additional_symptoms = patient.get('additional_symptoms', '')
+            if additional_symptoms:
+                patient_symptoms += [s.strip() for s in additional_symptoms.split(',') if s.strip()]
+            names.extend(patient_symptoms)
+            owners.extend([i] * len(patient_symptoms))
+        
+        normalized = pd.Series(names, dtype=object).astype(str).str.strip().str.lower() \
+            .str.replace(r'[\s_]+', '_', regex=True)
+        weights = normalized.map(self.severity_index).fillna(1).to_numpy(dtype=float)
+        
+        owners = np.asarray(owners, dtype=np.intp)
+        total_scores = np.bincount(owners, weights=weights, minlength=len(patients))
+        symptom_counts = np.bincount(owners, minlength=len(patients))
+        return total_scores, symptom_counts
+    
     def get_health_metrics(self, age, height, weight, temperature):
         """Calculate various health metrics"""
         bmi = weight / ((height/100) ** 2)
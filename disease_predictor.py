@@ -1,99 +1,962 @@
 import numpy as np
+import pandas as pd
+from scipy import sparse
+from scipy.special import logsumexp
 from sklearn.ensemble import RandomForestClassifier, GradientBoostingClassifier
-from sklearn.linear_model import LogisticRegression
+from sklearn.linear_model import LogisticRegression, SGDClassifier
+from sklearn.naive_bayes import BernoulliNB
+from sklearn.neural_network import MLPClassifier
 from sklearn.svm import SVC
-from sklearn.model_selection import train_test_split
+from sklearn.kernel_approximation import Nystroem
+from sklearn.pipeline import Pipeline, make_pipeline
+from sklearn.preprocessing import FunctionTransformer, LabelEncoder
+from sklearn.exceptions import NotFittedError
+from sklearn.utils.validation import check_is_fitted, has_fit_parameter
+from sklearn.model_selection import train_test_split, GroupShuffleSplit
 from sklearn.metrics import accuracy_score
 import joblib
+from joblib import Parallel, delayed
+from prediction_cache import PredictionCache
+from symptom_encoder import SymptomEncoder
+from exact_match_index import ExactMatchIndex
+from tree_engine import compile_tree_models
+from model_store import ModelSet, load_current_bundle, save_bundle
+from training_checkpoint import CHECKPOINT_DIR, TrainingCheckpoint, save_checkpoint
+import os
+import threading
+import time
+from collections import deque
 import warnings
 warnings.filterwarnings('ignore')
 
+# Boosting rounds without improvement on the validation slice before LightGBM stops
+EARLY_STOPPING_ROUNDS = 20
+# Fraction of the training split held out as that validation slice
+EARLY_STOPPING_FRACTION = 0.1
+
+def to_float32(X):
+    """Cast a boolean symptom matrix to float32, keeping it sparse"""
+    return X.astype(np.float32)
+
+def make_lightgbm_classifier(n_jobs):
+    """Histogram-based multi-threaded gradient boosting; lightgbm is imported only when used
+    
+    LightGBM reads CSR matrices natively but only float ones, so the boolean
+    symptom matrix is cast first.
+    """
+    from lightgbm import LGBMClassifier
+    return make_pipeline(
+        FunctionTransformer(to_float32, accept_sparse=True),
+        LGBMClassifier(
+            n_estimators=1000,  # upper bound, early stopping picks the actual number of rounds
+            learning_rate=0.1,
+            num_leaves=31,
+            min_child_samples=5,
+            subsample_for_bin=50000,
+            n_jobs=n_jobs,
+            random_state=42,
+            verbose=-1
+        )
+    )
+
+# Answers that did not come from the serving models; they get no model version and are not cached
+FALLBACK_SOURCES = ('fallback', 'naive_bayes')
+
+# Factories for the available ensemble members, keyed by kind
+ENSEMBLE_MEMBER_FACTORIES = {
+    'random_forest': lambda n_jobs: RandomForestClassifier(n_estimators=100, random_state=42, n_jobs=n_jobs),
+    # Exact boosting: one tree per class per stage, very slow with hundreds of diseases
+    'gradient_boosting': lambda n_jobs: GradientBoostingClassifier(n_estimators=100, random_state=42),
+    # Histogram boosting on the sparse matrix, with early stopping
+    'lightgbm': make_lightgbm_classifier,
+    'logistic_regression': lambda n_jobs: LogisticRegression(random_state=42, max_iter=1000),
+    # Exact RBF SVC: quadratic or worse in the number of rows, plus 5-fold Platt calibration
+    'svc': lambda n_jobs: SVC(probability=True, random_state=42),
+    # RBF kernel approximated by Nystroem features, with a multinomial logistic regression
+    # on top for calibrated probabilities; linear in the number of rows
+    'kernel_approx': lambda n_jobs: make_pipeline(
+        Nystroem(kernel='rbf', n_components=300, random_state=42),
+        LogisticRegression(random_state=42, max_iter=1000)
+    )
+}
+
+# Incremental members for streaming training, keyed by kind; all support partial_fit
+STREAMING_MEMBER_FACTORIES = {
+    'sgd': lambda: SGDClassifier(loss='log_loss', alpha=1e-5, random_state=42),
+    'bernoulli_nb': lambda: BernoulliNB(),
+    # Mini-batch multilayer perceptron, one pass per chunk
+    'mlp': lambda: MLPClassifier(hidden_layer_sizes=(256,), random_state=42),
+    # Nystroem features fitted on rows sampled across the file, with a log-loss SGD classifier on top
+    'kernel_approx_sgd': lambda: make_pipeline(
+        Nystroem(kernel='rbf', n_components=300, random_state=42),
+        SGDClassifier(loss='log_loss', alpha=1e-5, random_state=42)
+    )
+}
+
+# Ensemble used by streaming training by default
+DEFAULT_STREAMING_ENSEMBLE = {
+    'SGD': 'sgd',
+    'NaiveBayes': 'bernoulli_nb',
+    'KernelApprox': 'kernel_approx_sgd'
+}
+
+# Rows held out for evaluating streamed members, sampled across the whole file
+STREAMING_HOLDOUT_FRACTION = 0.05
+STREAMING_HOLDOUT_MAX_ROWS = 20000
+# Rows sampled across the whole file to fit the transformers of streaming members
+STREAMING_TRANSFORMER_SAMPLE_ROWS = 2000
+
+# Largest batch sent to the compiled tree engines; sklearn's Cython loops win on bigger ones
+COMPILED_TREES_MAX_ROWS = 64
+
+# Cascade stages from cheapest to costliest; members not listed run last
+DEFAULT_CASCADE_ORDER = ['NaiveBayes', 'SGD', 'LogisticRegression', 'KernelApprox', 'SVM', 'LightGBM',
+                         'RandomForest', 'GradientBoosting']
+
+# Ensemble used by default: member name -> kind in ENSEMBLE_MEMBER_FACTORIES
+DEFAULT_ENSEMBLE = {
+    'RandomForest': 'random_forest',
+    'GradientBoosting': 'gradient_boosting',
+    'LogisticRegression': 'logistic_regression',
+    'KernelApprox': 'kernel_approx'
+}
+
+def get_fit_params(model, sample_weight):
+    """Route sample weights to a member's fit; pipelines pass them to their final step"""
+    if sample_weight is None:
+        return {}
+    if isinstance(model, Pipeline):
+        step_name, estimator = model.steps[-1]
+        if has_fit_parameter(estimator, 'sample_weight'):
+            return {f"{step_name}__sample_weight": sample_weight}
+        return {}
+    if has_fit_parameter(model, 'sample_weight'):
+        return {'sample_weight': sample_weight}
+    return {}
+
+def stops_early(model):
+    """Check whether a member is fitted with early stopping on a validation slice"""
+    estimator = model.steps[-1][1] if isinstance(model, Pipeline) else model
+    return type(estimator).__module__.startswith('lightgbm')
+
+def get_early_stopping_split(model, X_train, y_train, sample_weight=None):
+    """Carve a validation slice off the training split for early stopping
+    
+    Returns the rows left for fitting and the fit parameters that evaluate on the slice.
+    The test split is not used, so the reported accuracy stays unbiased.
+    """
+    from lightgbm import early_stopping
+    
+    rows = np.arange(X_train.shape[0])
+    try:
+        fit_rows, validation_rows = train_test_split(
+            rows, test_size=EARLY_STOPPING_FRACTION, random_state=42, stratify=y_train
+        )
+    except ValueError:
+        fit_rows, validation_rows = train_test_split(rows, test_size=EARLY_STOPPING_FRACTION, random_state=42)
+    
+    # Diseases missing from the fitting rows cannot be scored, so keep their rows for fitting
+    unseen = ~np.isin(y_train[validation_rows], y_train[fit_rows])
+    fit_rows = np.sort(np.concatenate([fit_rows, validation_rows[unseen]]))
+    validation_rows = validation_rows[~unseen]
+    
+    fit_params = {}
+    if len(validation_rows):
+        # The pipeline does not transform eval_set, so apply its preprocessing here
+        X_validation = X_train[validation_rows]
+        if isinstance(model, Pipeline):
+            X_validation = model[:-1].fit_transform(X_validation)
+        fit_params['eval_set'] = [(X_validation, y_train[validation_rows])]
+        fit_params['callbacks'] = [early_stopping(EARLY_STOPPING_ROUNDS, verbose=False)]
+    if sample_weight is not None:
+        fit_params['sample_weight'] = sample_weight[fit_rows]
+        if len(validation_rows):
+            fit_params['eval_sample_weight'] = [sample_weight[validation_rows]]
+    
+    if isinstance(model, Pipeline):
+        step_name = model.steps[-1][0]
+        fit_params = {f"{step_name}__{key}": value for key, value in fit_params.items()}
+    return X_train[fit_rows], y_train[fit_rows], fit_params
+
+def fit_ensemble_member(name, model, X_train, y_train, X_test, y_test, checkpoint_path=None,
+                        sample_weight=None, test_weight=None):
+    """Fit and evaluate one ensemble member, timing both steps (runs in a worker process)
+    
+    With a checkpoint_path the result is saved as soon as the member is done, so an
+    interrupted training run keeps it. Weights count the duplicates each row stands for.
+    """
+    warnings.filterwarnings('ignore')
+    
+    start = time.perf_counter()
+    if stops_early(model):
+        X_fit, y_fit, fit_params = get_early_stopping_split(model, X_train, y_train, sample_weight)
+        model.fit(X_fit, y_fit, **fit_params)
+    else:
+        model.fit(X_train, y_train, **get_fit_params(model, sample_weight))
+    fit_seconds = time.perf_counter() - start
+    
+    start = time.perf_counter()
+    score = accuracy_score(y_test, model.predict(X_test), sample_weight=test_weight)
+    evaluate_seconds = time.perf_counter() - start
+    
+    member = (name, model, score, fit_seconds, evaluate_seconds)
+    if checkpoint_path is not None:
+        save_checkpoint(checkpoint_path, member)
+    return member
+
+def reservoir_slots(seen, n_rows, size, rng):
+    """Get the reservoir slots taken by the next n_rows of a stream, -1 for rows left out
+    
+    Algorithm R: the i-th row of the stream replaces a random slot with probability
+    size / (i + 1), so the reservoir is a uniform sample of all rows seen so far.
+    Later rows taking the same slot overwrite earlier ones, as they would one by one.
+    """
+    positions = seen + np.arange(n_rows)
+    slots = rng.integers(0, positions + 1)
+    filling = positions < size
+    slots[filling] = positions[filling]
+    slots[slots >= size] = -1
+    return slots
+
+class ChunkShuffleBuffer:
+    """Pool several chunks and hand out chunk-sized batches drawn at random from the pool
+    
+    Read in a random order, the pooled chunks come from far apart in the file, so each
+    batch mixes diseases that a file sorted by disease keeps in separate chunks.
+    """
+    
+    def __init__(self, n_chunks, rng):
+        self.n_chunks = max(n_chunks, 1)
+        self.rng = rng
+        self.X = []
+        self.y = []
+        # Chunks' worth of rows in the pool
+        self.chunks = 0
+    
+    def add(self, X, y):
+        """Add a chunk and return the batch it frees once the pool is full"""
+        self.X.append(X)
+        self.y.append(y)
+        self.chunks += 1
+        if self.chunks < self.n_chunks:
+            return []
+        
+        X_pool, y_pool = sparse.vstack(self.X, format='csr'), np.concatenate(self.y)
+        rows = self.rng.permutation(len(y_pool))
+        batch, rest = rows[:len(rows) // self.chunks], rows[len(rows) // self.chunks:]
+        self.X, self.y = [X_pool[rest]], [y_pool[rest]]
+        self.chunks -= 1
+        return [(X_pool[batch], y_pool[batch])]
+    
+    def drain(self):
+        """Return the rest of the pool as shuffled batches and empty it"""
+        if not self.chunks:
+            return []
+        
+        X_pool, y_pool = sparse.vstack(self.X, format='csr'), np.concatenate(self.y)
+        batches = np.array_split(self.rng.permutation(len(y_pool)), self.chunks)
+        self.X, self.y = [], []
+        self.chunks = 0
+        return [(X_pool[batch], y_pool[batch]) for batch in batches if len(batch)]
+
+def fit_member_transformers(model, X):
+    """Fit the transformers of a pipeline member, e.g. Nystroem, on a sample of the training rows"""
+    if isinstance(model, Pipeline):
+        for _, step in model.steps[:-1]:
+            X = step.fit_transform(X)
+
+def partial_fit_member(model, X, y, classes):
+    """Update a streaming member with one chunk; unfitted pipeline transformers are fitted on it"""
+    if isinstance(model, Pipeline):
+        for _, step in model.steps[:-1]:
+            try:
+                check_is_fitted(step)
+            except NotFittedError:
+                step.fit(X)
+            X = step.transform(X)
+        model = model.steps[-1][1]
+    model.partial_fit(X, y, classes=classes)
+
+class NaiveBayesEngine:
+    """Bernoulli naive Bayes over per-disease symptom counts
+    
+    The log-posterior of a disease is its base term, the log prior plus the sum of
+    log(1 - p) over all symptoms, plus the log-odds log(p / (1 - p)) of every symptom
+    present. Scoring a patient is therefore a sparse dot product over the selected
+    symptoms only, and new labeled rows just add to the counts.
+    """
+    
+    def __init__(self, diseases, symptom_columns, symptom_counts, row_counts, alpha=1.0):
+        self.symptom_columns = list(symptom_columns)
+        self.symptom_encoder = SymptomEncoder(self.symptom_columns)
+        self.alpha = alpha
+        self.lock = threading.Lock()
+        self.symptom_counts = None
+        self.row_counts = None
+        self.absent_sum = None
+        # (diseases, log_odds, base) is swapped as one tuple and read without the lock
+        self.tables = None
+        self.install(list(diseases), np.asarray(symptom_counts, dtype=np.float64),
+                     np.asarray(row_counts, dtype=np.float64))
+    
+    @classmethod
+    def from_data_processor(cls, data_processor, alpha=1.0):
+        """Build the engine from the disease profiles of the augmented dataset, or None without them"""
+        if data_processor.disease_symptom_counts is None:
+            return None
+        return cls(data_processor.profile_diseases, data_processor.get_symptom_columns(),
+                   data_processor.disease_symptom_counts, data_processor.disease_row_counts, alpha)
+    
+    @classmethod
+    def from_rows(cls, X, diseases, symptom_columns, alpha=1.0):
+        """Build the engine from a binary symptom matrix and its disease labels"""
+        engine = cls([], symptom_columns, np.zeros((0, len(symptom_columns))), np.zeros(0), alpha)
+        engine.update(X, diseases)
+        return engine
+    
+    @property
+    def diseases(self):
+        return self.tables[0]
+    
+    def install(self, diseases, symptom_counts, row_counts, changed=None):
+        """Compute the log tables from the counts and swap them in as one tuple
+        
+        changed limits the recomputation to those disease rows; the old tables are
+        copied, so concurrent readers keep a consistent snapshot.
+        """
+        rows = row_counts if changed is None else row_counts[changed]
+        counts = symptom_counts if changed is None else symptom_counts[changed]
+        p = (counts + self.alpha) / (rows[:, np.newaxis] + 2 * self.alpha)
+        log_absent = np.log1p(-p)
+        
+        if changed is None:
+            # Symptoms x diseases, so the rows of the selected symptoms are contiguous
+            log_odds = np.ascontiguousarray((np.log(p) - log_absent).T)
+            absent_sum = log_absent.sum(axis=1)
+        else:
+            log_odds, absent_sum = self.tables[1].copy(), self.absent_sum.copy()
+            log_odds[:, changed] = (np.log(p) - log_absent).T
+            absent_sum[changed] = log_absent.sum(axis=1)
+        
+        # The empirical prior, as in BernoulliNB, depends on the total row count, so it is always recomputed
+        prior = np.log(row_counts) - np.log(max(row_counts.sum(), 1))
+        self.symptom_counts, self.row_counts, self.absent_sum = symptom_counts, row_counts, absent_sum
+        self.tables = (diseases, log_odds, prior + absent_sum)
+    
+    def update(self, X, diseases):
+        """Add newly labeled rows to the counts, recomputing only the diseases they touch"""
+        X = sparse.csr_matrix(X, dtype=np.float64)
+        labels = np.asarray(diseases, dtype=object)
+        
+        with self.lock:
+            known = self.tables[0]
+            disease_index = {disease: i for i, disease in enumerate(known)}
+            new_diseases = [disease for disease in pd.unique(labels) if disease not in disease_index]
+            for disease in new_diseases:
+                disease_index[disease] = len(disease_index)
+            
+            codes = np.array([disease_index[disease] for disease in labels], dtype=np.intp)
+            n_diseases = len(disease_index)
+            membership = sparse.csr_matrix(
+                (np.ones(len(codes)), (codes, np.arange(len(codes)))), shape=(n_diseases, len(codes))
+            )
+            
+            symptom_counts = np.vstack([self.symptom_counts, np.zeros((len(new_diseases), len(self.symptom_columns)))])
+            row_counts = np.concatenate([self.row_counts, np.zeros(len(new_diseases))])
+            changed = np.unique(codes)
+            symptom_counts[changed] += (membership[changed] @ X).toarray()
+            row_counts += np.bincount(codes, minlength=n_diseases)
+            
+            # New diseases change the table shapes, so those updates rebuild everything
+            self.install(list(known) + new_diseases, symptom_counts, row_counts,
+                         changed=None if new_diseases else changed)
+    
+    def predict_log_proba(self, X):
+        """Normalized log-posteriors for a binary symptom matrix over symptom_columns"""
+        _, log_odds, base = self.tables
+        scores = sparse.csr_matrix(X, dtype=np.float64) @ log_odds + base
+        return scores - logsumexp(scores, axis=1, keepdims=True)
+    
+    def predict_proba(self, X):
+        """Posterior probabilities for a binary symptom matrix over symptom_columns"""
+        return np.exp(self.predict_log_proba(X))
+    
+    def rank(self, columns, top_k=3):
+        """Most likely diseases for one set of symptom columns, as (disease, probability) pairs"""
+        diseases, log_odds, base = self.tables
+        scores = base + log_odds[columns].sum(axis=0)
+        # A plain softmax; scipy's logsumexp costs more than the dot product for one row
+        proba = np.exp(scores - scores.max())
+        proba /= proba.sum()
+        
+        k = min(top_k, len(diseases))
+        top = np.argpartition(-proba, k - 1)[:k]
+        top = top[np.argsort(-proba[top])]
+        return [(diseases[i], float(proba[i])) for i in top]
+    
+    def predict_patient(self, user_data, top_k=3):
+        """Rank diseases for a user_data dict, or None if none of its symptoms are known"""
+        columns = self.symptom_encoder.encode(user_data)
+        if not len(columns) or not len(self.diseases):
+            return None
+        return self.rank(columns, top_k)
+
 class DiseasePredictor:
-    def __init__(self):
-        self.models = {}
-        self.label_encoders = {}
-        self.symptom_columns = []
+    def __init__(self, voting='soft', model_weights=None, training_workers=None, n_jobs=-1,
+                 ensemble_config=None, cache_size=1024, cache_ttl=3600, exact_match_min_support=5,
+                 cascade_order=None, cascade_margin=0.2, latency_budget_ms=None, compiled_trees=True,
+                 background_training=False, checkpoint_dir=CHECKPOINT_DIR, training_mode='batch',
+                 streaming_chunksize=50000, streaming_epochs=1, streaming_shuffle_chunks=16,
+                 deduplicate_training=None, feature_selection=None, data_processor=None):
+        self.voting = voting
+        self.training_mode = training_mode
+        self.streaming_chunksize = streaming_chunksize
+        self.streaming_epochs = streaming_epochs
+        # Chunks pooled and reshuffled together, so batches mix rows from across the file
+        self.streaming_shuffle_chunks = streaming_shuffle_chunks
+        default_ensemble = DEFAULT_STREAMING_ENSEMBLE if training_mode == 'streaming' else DEFAULT_ENSEMBLE
+        self.ensemble_config = dict(ensemble_config or default_ensemble)
+        self.model_weights = model_weights or {}
+        self.cascade_order = list(cascade_order or DEFAULT_CASCADE_ORDER)
+        self.cascade_margin = cascade_margin
+        self.latency_budget_ms = latency_budget_ms
+        self.cascade_stats = {}
+        self.cascade_stats_lock = threading.Lock()
+        self.training_workers = training_workers
+        self.n_jobs = n_jobs
+        self.training_report = {}
+        self.checkpoint_dir = checkpoint_dir
+        # Streaming training reads rows once, so duplicates can only be collapsed in batch mode
+        self.deduplicate_training = training_mode != 'streaming' if deduplicate_training is None else deduplicate_training
+        # Keyword arguments for DataProcessor.select_symptom_columns, e.g. {'min_support': 0.001}
+        self.feature_selection = feature_selection
+        self.dedup_report = {}
+        self.background_training = background_training
+        self.training_thread = None
+        self.training_status = {'state': 'idle', 'stage': '', 'progress': 0.0, 'error': None}
+        self.training_status_lock = threading.Lock()
+        self.compiled_trees = compiled_trees
+        # Models, feature columns and labels are swapped together as one ModelSet
+        self.model_set = ModelSet()
+        self.swap_lock = threading.Lock()
         self.disease_info = {}
+        self.exact_match_min_support = exact_match_min_support
+        self.prediction_cache = PredictionCache(maxsize=cache_size, ttl=cache_ttl)
+        # Count-table naive Bayes answers while no trained models are available
+        self.naive_bayes = NaiveBayesEngine.from_data_processor(data_processor) if data_processor else None
         self.load_or_train_models()
     
+    @property
+    def models(self):
+        return self.model_set.models
+    
+    @property
+    def symptom_columns(self):
+        return self.model_set.symptom_columns
+    
+    @property
+    def symptom_encoder(self):
+        return self.model_set.symptom_encoder
+    
+    @property
+    def label_encoders(self):
+        return self.model_set.label_encoders
+    
+    @property
+    def compiled_models(self):
+        return self.model_set.compiled_models
+    
+    @property
+    def exact_match_index(self):
+        return self.model_set.exact_match_index
+    
+    @property
+    def model_version(self):
+        return self.model_set.version
+    
     def load_or_train_models(self):
         """Load pre-trained models or train new ones"""
         try:
-            # Try to load pre-trained models
-            self.models = joblib.load('disease_models.pkl')
-            self.label_encoders = joblib.load('label_encoders.pkl')
-            self.symptom_columns = joblib.load('symptom_columns.pkl')
+            # Prefer the current artifact bundle; its models load on first use
+            bundle = load_current_bundle()
+            if bundle is not None:
+                model_set = ModelSet.from_bundle(bundle, self.compiled_trees)
+            else:
+                # Fall back to the single-file models of older releases
+                models = joblib.load('disease_models.pkl')
+                model_set = ModelSet(
+                    models, joblib.load('symptom_columns.pkl'), joblib.load('label_encoders.pkl'),
+                    compiled_models=self.compile_tree_models(models)
+                )
+            self.swap_model_set(model_set)
             print("Loaded pre-trained models")
         except:
-            # Train new models
+            # Train new models, in the background if requests must not wait for them
+            if self.background_training:
+                self.start_background_training()
+            else:
+                self.train()
+    
+    def swap_model_set(self, model_set):
+        """Replace the serving models in one step and return the previous model set"""
+        with self.swap_lock:
+            previous = self.model_set
+            self.model_set = model_set
+            # Cached predictions and stage latencies belong to the previous models
+            self.prediction_cache.clear()
+            with self.cascade_stats_lock:
+                self.cascade_stats = {}
+        return previous
+    
+    def start_background_training(self):
+        """Train in a background thread while requests get rule-based fallback predictions"""
+        if self.training_thread is not None and self.training_thread.is_alive():
+            return self.training_thread
+        
+        self.set_training_status('training', 'starting', 0.0)
+        self.training_thread = threading.Thread(target=self.run_background_training, name='model-training',
+                                                daemon=True)
+        self.training_thread.start()
+        return self.training_thread
+    
+    def run_background_training(self):
+        """Body of the background training thread"""
+        try:
+            self.train()
+        except Exception as e:
+            print(f"Background training failed: {e}")
+            self.set_training_status('failed', 'failed', error=str(e))
+    
+    def wait_for_training(self, timeout=None):
+        """Block until background training finishes; returns False on timeout"""
+        if self.training_thread is None:
+            return True
+        self.training_thread.join(timeout)
+        return not self.training_thread.is_alive()
+    
+    def set_training_status(self, state, stage, progress=None, error=None):
+        """Record the state, current stage and progress (0-1) of training"""
+        with self.training_status_lock:
+            self.training_status['state'] = state
+            self.training_status['stage'] = stage
+            if progress is not None:
+                self.training_status['progress'] = progress
+            self.training_status['error'] = error
+    
+    def get_training_status(self):
+        """Get the state, stage and progress of training"""
+        with self.training_status_lock:
+            return dict(self.training_status)
+    
+    def train(self):
+        """Train with the configured training mode"""
+        if self.training_mode == 'streaming':
+            self.train_streaming_models()
+        else:
             self.train_models()
     
     def train_models(self):
-        """Train machine learning models for disease prediction"""
+        """Train machine learning models for disease prediction
+        
+        The new models are built on the side and swapped in once complete, so
+        concurrent requests keep using the previous models (or the fallback) meanwhile.
+        """
         from data_processor import DataProcessor
         
+        self.set_training_status('training', 'loading data', 0.0)
+        
         # Initialize data processor
         data_processor = DataProcessor()
         
-        # Get training data
-        X, y = data_processor.prepare_training_data()
+        # The naive Bayes tables come from the disease profiles, so the fallback improves right away
+        self.install_naive_bayes(NaiveBayesEngine.from_data_processor(data_processor))
         
-        if X is None or len(X) == 0:
+        # Shrink the feature space before duplicates are counted, as it creates more of them
+        if self.feature_selection:
+            data_processor.select_symptom_columns(**self.feature_selection)
+            report = data_processor.feature_selection['report']
+            print(f"Selected {report['selected_columns']} of {report['original_columns']} symptom columns")
+        
+        # Get training data as a sparse matrix, with duplicate rows collapsed into weights
+        if self.deduplicate_training:
+            X, y, sample_weight = data_processor.prepare_training_data(sparse_features=True, deduplicate=True)
+            groups = data_processor.training_groups
+        else:
+            X, y = data_processor.prepare_training_data(sparse_features=True)
+            sample_weight = groups = None
+        
+        if X is None or X.shape[0] == 0:
             print("No training data available")
+            self.set_training_status('failed', 'no training data', error="No training data available")
             return
         
-        # Store symptom columns
-        self.symptom_columns = X.columns.tolist()
+        symptom_columns = data_processor.get_feature_columns()
+        feature_aliases = data_processor.get_feature_aliases()
+        if self.deduplicate_training:
+            self.dedup_report = data_processor.dedup_report
+            print(f"Deduplicated {self.dedup_report['rows']} rows into {self.dedup_report['unique_rows']} "
+                  f"unique rows (duplication ratio {self.dedup_report['duplication_ratio']:.2f})")
         
-        # Split data (handle case where some classes have only 1 sample)
-        try:
-            X_train, X_test, y_train, y_test = train_test_split(
-                X, y, test_size=0.2, random_state=42, stratify=y
-            )
-        except ValueError:
-            # If stratification fails, use random split
-            X_train, X_test, y_train, y_test = train_test_split(
-                X, y, test_size=0.2, random_state=42
+        # Resume from the stages an interrupted run on the same data completed
+        checkpoint = None
+        split = None
+        if self.checkpoint_dir:
+            try:
+                checkpoint = TrainingCheckpoint.for_data(self.checkpoint_dir, X, y, symptom_columns,
+                                                         test_size=0.2, random_state=42,
+                                                         sample_weight=sample_weight)
+                split = checkpoint.load_split()
+            except Exception as e:
+                print(f"Training checkpoints disabled: {e}")
+                checkpoint = None
+        
+        if split is None:
+            split = self.split_training_data(X, y, sample_weight, groups)
+            if checkpoint is not None:
+                split = checkpoint.save_split(*split)
+        X_train, X_test, y_train, y_test, w_train, w_test = split
+        
+        # Train multiple models, skipping those an earlier run already fitted
+        models_to_train = self.build_ensemble_members()
+        fitted_members = []
+        checkpoint_paths = {}
+        if checkpoint is not None:
+            for name, model in list(models_to_train.items()):
+                checkpoint_paths[name] = checkpoint.member_path(name, model)
+                member = checkpoint.load_member(name, model)
+                if member is not None:
+                    fitted_members.append(member)
+                    del models_to_train[name]
+        resumed = {member[0] for member in fitted_members}
+        n_members = len(models_to_train) + len(resumed)
+        if resumed:
+            print(f"Resuming training: {', '.join(sorted(resumed))} restored from checkpoints")
+        self.set_training_status('training', f"fitting {len(resumed)}/{n_members} models",
+                                 0.1 + 0.8 * len(resumed) / n_members)
+        
+        # Fit the members concurrently in worker processes; joblib memory-maps
+        # the arrays behind the training matrix instead of copying them to each worker
+        workers = self.training_workers or max(1, min(len(models_to_train), os.cpu_count() or 1))
+        start = time.perf_counter()
+        for member in Parallel(n_jobs=workers, backend='loky', max_nbytes='1M', mmap_mode='r',
+                               return_as='generator_unordered')(
+            delayed(fit_ensemble_member)(name, model, X_train, y_train, X_test, y_test,
+                                         checkpoint_paths.get(name), w_train, w_test)
+            for name, model in models_to_train.items()
+        ):
+            fitted_members.append(member)
+            self.set_training_status(
+                'training', f"fitting {len(fitted_members)}/{n_members} models",
+                0.1 + 0.8 * len(fitted_members) / n_members
             )
+        wall_seconds = time.perf_counter() - start
         
-        # Train multiple models
-        models_to_train = {
-            'RandomForest': RandomForestClassifier(n_estimators=100, random_state=42),
-            'GradientBoosting': GradientBoostingClassifier(n_estimators=100, random_state=42),
-            'LogisticRegression': LogisticRegression(random_state=42, max_iter=1000),
-            'SVM': SVC(probability=True, random_state=42)
-        }
+        # Members finish in any order; keep the configured order for reproducible voting
+        member_order = list(self.ensemble_config)
+        fitted_members.sort(key=lambda member: member_order.index(member[0]))
         
         best_model = None
         best_score = 0
+        models = {}
+        training_report = {}
         
-        for name, model in models_to_train.items():
-            # Train model
-            model.fit(X_train, y_train)
-            
-            # Evaluate model
-            y_pred = model.predict(X_test)
-            score = accuracy_score(y_test, y_pred)
-            
-            print(f"{name} Accuracy: {score:.3f}")
+        for name, model, score, fit_seconds, evaluate_seconds in fitted_members:
+            print(f"{name} Accuracy: {score:.3f} (fit {fit_seconds:.1f}s, evaluate {evaluate_seconds:.1f}s)")
             
             # Store model
-            self.models[name] = model
+            models[name] = model
+            training_report[name] = {
+                'accuracy': score,
+                'fit_seconds': fit_seconds,
+                'evaluate_seconds': evaluate_seconds,
+                'resumed': name in resumed
+            }
             
             # Track best model
             if score > best_score:
                 best_score = score
                 best_model = name
         
+        print(f"Trained {len(models_to_train)} models with {workers} workers in {wall_seconds:.1f}s")
         print(f"Best model: {best_model} with accuracy: {best_score:.3f}")
         
-        # Save models
-        joblib.dump(self.models, 'disease_models.pkl')
-        joblib.dump(self.label_encoders, 'label_encoders.pkl')
-        joblib.dump(self.symptom_columns, 'symptom_columns.pkl')
+        self.set_training_status('training', 'indexing and saving', 0.9)
+        symptom_encoder = SymptomEncoder(symptom_columns, feature_aliases)
+        model_set = ModelSet(
+            models, symptom_columns,
+            # Keep the label classes so model outputs decode to disease names
+            {'diseases': data_processor.label_encoders['diseases']},
+            compiled_models=self.compile_tree_models(models),
+            # Index the disease distribution of every distinct training vector
+            exact_match_index=ExactMatchIndex.build(
+                symptom_encoder.pack_matrix(X_train), y_train,
+                data_processor.label_encoders['diseases'].classes_.tolist(), row_counts=w_train
+            ),
+            feature_aliases=feature_aliases
+        )
+        
+        # Save models as a new artifact bundle version
+        try:
+            bundle_dir = save_bundle(
+                models, symptom_columns, model_set.label_encoders['diseases'],
+                compiled_models=model_set.compiled_models, exact_match_index=model_set.exact_match_index,
+                feature_aliases=feature_aliases,
+                extra={
+                    'dedup_report': self.dedup_report,
+                    'feature_selection': (data_processor.feature_selection or {}).get('report')
+                }
+            )
+            model_set.version = os.path.basename(bundle_dir)
+            
+            # The bundle now holds the fitted members; a later retrain must not resume from them
+            if checkpoint is not None:
+                checkpoint.clear()
+        except Exception as e:
+            print(f"Could not save model bundle: {e}")
         
         # Create disease information database
         self.create_disease_database(data_processor)
+        self.training_report = training_report
+        self.swap_model_set(model_set)
+        self.set_training_status('ready', 'ready', 1.0)
+    
+    def split_training_data(self, X, y, sample_weight=None, groups=None):
+        """Split into train and test sets, keeping each symptom vector on one side when grouped
+        
+        Returns X_train, X_test, y_train, y_test and the train and test sample weights.
+        """
+        if groups is not None:
+            try:
+                train_rows, test_rows = next(
+                    GroupShuffleSplit(n_splits=1, test_size=0.2, random_state=42).split(X, y, groups)
+                )
+                return (X[train_rows], X[test_rows], y[train_rows], y[test_rows],
+                        sample_weight[train_rows], sample_weight[test_rows])
+            except ValueError:
+                # Too few distinct vectors to split by group
+                pass
+        
+        arrays = [X, y] if sample_weight is None else [X, y, sample_weight]
+        
+        # Split data (handle case where some classes have only 1 sample)
+        try:
+            split = train_test_split(
+                *arrays, test_size=0.2, random_state=42, stratify=y
+            )
+        except ValueError:
+            # If stratification fails, use random split
+            split = train_test_split(
+                *arrays, test_size=0.2, random_state=42
+            )
+        
+        if sample_weight is None:
+            split += [None, None]
+        return tuple(split)
+    
+    def train_streaming_models(self, path=None):
+        """Train incremental members chunk by chunk over the symptom CSV
+        
+        Memory stays bounded by a few chunks plus capped samples, whatever the file size.
+        A first pass counts the labels and samples the hold-out and the rows that fit the
+        member transformers across the whole file. Each epoch then reads the chunks in a
+        random order through a shuffle buffer and updates every member through partial_fit.
+        """
+        from data_processor import DataProcessor, SYMPTOMS_DATA_FILE, find_chunk_offsets, iter_symptom_chunks
+        path = path or SYMPTOMS_DATA_FILE
+        
+        # Both need the whole matrix in memory, which streaming avoids
+        if self.feature_selection:
+            print("Warning: feature_selection is not supported in streaming mode; training on all symptom columns")
+        if self.deduplicate_training:
+            print("Warning: deduplicate_training is not supported in streaming mode; training on every row")
+        
+        # The first pass fixes the classes every partial_fit call needs; rows are sampled
+        # with reservoirs, so a file sorted by disease still gives samples of every disease
+        self.set_training_status('training', 'scanning data', 0.0)
+        rng = np.random.default_rng(42)
+        disease_counts = pd.Series(dtype=np.int64)
+        holdout_sample = np.empty(STREAMING_HOLDOUT_MAX_ROWS, dtype=np.int64)
+        transformer_sample = None
+        transformer_sample_rows = np.empty(STREAMING_TRANSFORMER_SAMPLE_ROWS, dtype=np.int64)
+        seen_rows = 0
+        try:
+            chunk_offsets = find_chunk_offsets(path, self.streaming_chunksize)
+            for symptom_columns, X, labels, row_numbers in iter_symptom_chunks(path, self.streaming_chunksize):
+                disease_counts = disease_counts.add(pd.Series(labels).value_counts(), fill_value=0)
+                
+                slots = reservoir_slots(seen_rows, len(labels), STREAMING_HOLDOUT_MAX_ROWS, rng)
+                sampled = np.flatnonzero(slots >= 0)
+                holdout_sample[slots[sampled]] = row_numbers[sampled]
+                
+                if transformer_sample is None:
+                    transformer_sample = np.zeros((STREAMING_TRANSFORMER_SAMPLE_ROWS, X.shape[1]), dtype=np.float32)
+                slots = reservoir_slots(seen_rows, len(labels), STREAMING_TRANSFORMER_SAMPLE_ROWS, rng)
+                sampled = np.flatnonzero(slots >= 0)
+                transformer_sample[slots[sampled]] = X[sampled].toarray()
+                transformer_sample_rows[slots[sampled]] = row_numbers[sampled]
+                seen_rows += len(labels)
+            
+            disease_counts = disease_counts.astype(np.int64).sort_index()
+            label_encoder = LabelEncoder()
+            label_encoder.classes_ = np.array(disease_counts.index.tolist(), dtype=object)
+        except Exception as e:
+            print(f"Streaming training failed: {e}")
+            self.set_training_status('failed', 'reading data', error=str(e))
+            return
+        classes = np.arange(len(label_encoder.classes_))
+        total_rows = max(seen_rows, 1) * self.streaming_epochs
+        
+        # Narrow the hold-out sample to its share of the file, a uniform sample again
+        holdout_rows = holdout_sample[:min(seen_rows, STREAMING_HOLDOUT_MAX_ROWS)]
+        holdout_size = min(int(round(seen_rows * STREAMING_HOLDOUT_FRACTION)), STREAMING_HOLDOUT_MAX_ROWS)
+        if holdout_size < len(holdout_rows):
+            holdout_rows = rng.choice(holdout_rows, holdout_size, replace=False)
+        holdout_rows = np.sort(holdout_rows)
+        
+        models = self.build_ensemble_members()
+        if transformer_sample is not None:
+            sampled = min(seen_rows, STREAMING_TRANSFORMER_SAMPLE_ROWS)
+            transformer_rows = ~np.isin(transformer_sample_rows[:sampled], holdout_rows)
+            X_sample = sparse.csr_matrix(transformer_sample[:sampled][transformer_rows])
+            if X_sample.shape[0]:
+                for model in models.values():
+                    fit_member_transformers(model, X_sample)
+        
+        fit_seconds = {name: 0.0 for name in models}
+        holdout_X, holdout_y = [], []
+        symptom_counts = None
+        streamed_rows = 0
+        read_rows = 0
+        
+        for epoch in range(self.streaming_epochs):
+            # A new chunk order every epoch; the hold-out rows stay out of training in all of them
+            chunk_order = rng.permutation(len(chunk_offsets))
+            chunks = [(chunk_number, chunk_offsets[chunk_number]) for chunk_number in chunk_order]
+            shuffle_buffer = ChunkShuffleBuffer(self.streaming_shuffle_chunks, rng)
+            for chunk_count, (symptom_columns, X, labels, row_numbers) in enumerate(
+                    iter_symptom_chunks(path, self.streaming_chunksize, chunks)):
+                y = np.searchsorted(label_encoder.classes_, labels)
+                read_rows += len(y)
+                
+                held = np.isin(row_numbers, holdout_rows)
+                if epoch == 0:
+                    # Count the disease profiles on the way, for the disease information database
+                    membership = sparse.csr_matrix(
+                        (np.ones(len(y)), (y, np.arange(len(y)))), shape=(len(classes), len(y))
+                    )
+                    chunk_counts = (membership @ X).toarray()
+                    symptom_counts = chunk_counts if symptom_counts is None else symptom_counts + chunk_counts
+                    
+                    if held.any():
+                        holdout_X.append(X[np.flatnonzero(held)])
+                        holdout_y.append(y[held])
+                    streamed_rows += int((~held).sum())
+                
+                train_rows = np.flatnonzero(~held)
+                for X_batch, y_batch in shuffle_buffer.add(X[train_rows], y[train_rows]):
+                    self.partial_fit_members(models, X_batch, y_batch, classes, fit_seconds)
+                
+                self.set_training_status(
+                    'training', f"epoch {epoch + 1}/{self.streaming_epochs}, chunk {chunk_count + 1}",
+                    0.9 * min(read_rows / total_rows, 1.0)
+                )
+            
+            for X_batch, y_batch in shuffle_buffer.drain():
+                self.partial_fit_members(models, X_batch, y_batch, classes, fit_seconds)
+        
+        if not streamed_rows:
+            print("No training data available")
+            self.set_training_status('failed', 'no training data', error="No training data available")
+            return
+        
+        training_report = {}
+        for name, model in models.items():
+            start = time.perf_counter()
+            if holdout_X:
+                score = accuracy_score(np.concatenate(holdout_y), model.predict(sparse.vstack(holdout_X).tocsr()))
+            else:
+                score = float('nan')
+            training_report[name] = {
+                'accuracy': score,
+                'fit_seconds': fit_seconds[name],
+                'evaluate_seconds': time.perf_counter() - start,
+                'resumed': False,
+                'streamed_rows': streamed_rows
+            }
+            print(f"{name} Accuracy: {score:.3f} (partial_fit {fit_seconds[name]:.1f}s over {streamed_rows} rows)")
+        
+        self.set_training_status('training', 'saving', 0.9)
+        model_set = ModelSet(models, symptom_columns, {'diseases': label_encoder})
+        try:
+            bundle_dir = save_bundle(models, symptom_columns, label_encoder, extra={'training_mode': 'streaming'})
+            model_set.version = os.path.basename(bundle_dir)
+        except Exception as e:
+            print(f"Could not save model bundle: {e}")
+        
+        # Disease information and the naive Bayes fallback come from the profiles counted above
+        diseases = label_encoder.classes_.tolist()
+        row_counts = disease_counts.to_numpy()
+        self.create_disease_database(
+            DataProcessor.from_disease_profiles(diseases, symptom_columns, symptom_counts, row_counts)
+        )
+        self.install_naive_bayes(NaiveBayesEngine(diseases, symptom_columns, symptom_counts, row_counts))
+        
+        self.training_report = training_report
+        self.swap_model_set(model_set)
+        self.set_training_status('ready', 'ready', 1.0)
+    
+    def install_naive_bayes(self, engine):
+        """Serve a new naive Bayes engine, refilling the current one when the symptom columns match
+        
+        The follow-up questioner shares the engine's tables, so refilling it in place keeps
+        a single copy of them and the questioner follows the new counts.
+        """
+        if engine is None:
+            return
+        if self.naive_bayes is not None and self.naive_bayes.symptom_columns == engine.symptom_columns:
+            with self.naive_bayes.lock:
+                self.naive_bayes.install(list(engine.diseases), engine.symptom_counts, engine.row_counts)
+        else:
+            self.naive_bayes = engine
+    
+    def partial_fit_members(self, models, X, y, classes, fit_seconds):
+        """Update every streaming member with one batch, adding up the time each one takes"""
+        for name, model in models.items():
+            start = time.perf_counter()
+            partial_fit_member(model, X, y, classes)
+            fit_seconds[name] += time.perf_counter() - start
+    
+    def compile_tree_models(self, models):
+        """Compile the tree ensembles into flat node arrays for fast inference"""
+        if not self.compiled_trees:
+            return {}
+        
+        try:
+            return compile_tree_models(models)
+        except Exception as e:
+            print(f"Could not compile tree models, using sklearn inference: {e}")
+            return {}
+    
+    def get_inference_model(self, model_name, n_rows, model_set=None):
+        """Get the compiled engine of a member for small batches, else the sklearn model"""
+        model_set = model_set or self.model_set
+        if n_rows <= COMPILED_TREES_MAX_ROWS and model_name in model_set.compiled_models:
+            return model_set.compiled_models[model_name]
+        return model_set.models[model_name]
+    
+    def build_ensemble_members(self):
+        """Create the unfitted ensemble members from the ensemble configuration"""
+        members = {}
+        for name, kind in self.ensemble_config.items():
+            if self.training_mode == 'streaming':
+                if kind not in STREAMING_MEMBER_FACTORIES:
+                    raise ValueError(f"Unknown streaming member kind '{kind}' for {name}")
+                members[name] = STREAMING_MEMBER_FACTORIES[kind]()
+            else:
+                if kind not in ENSEMBLE_MEMBER_FACTORIES:
+                    raise ValueError(f"Unknown ensemble member kind '{kind}' for {name}")
+                members[name] = ENSEMBLE_MEMBER_FACTORIES[kind](self.n_jobs)
+        return members
     
     def create_disease_database(self, data_processor):
         """Create a comprehensive disease information database"""
@@ -102,41 +965,155 @@ class DiseasePredictor:
         for disease in diseases:
             self.disease_info[disease] = data_processor.get_disease_info(disease)
     
-    def predict_disease(self, user_data):
+    def predict_disease(self, user_data, latency_budget_ms=None):
         """Predict disease based on user input"""
-        if not self.models:
-            return self.get_fallback_prediction(user_data)
+        return self.predict_disease_batch([user_data], latency_budget_ms=latency_budget_ms)[0]
+    
+    def predict_disease_batch(self, patients, model_set=None, latency_budget_ms=None):
+        """Predict diseases for many patients with a single call per model
+        
+        patients is a list of user_data dicts or a DataFrame with one row per patient.
+        Returns one result per patient, in the same format as predict_disease.
+        model_set defaults to the serving models; other model sets can be warmed up with it.
+        latency_budget_ms overrides the cascade's latency budget for this request.
+        """
+        if isinstance(patients, pd.DataFrame):
+            patients = patients.to_dict('records')
+        patients = list(patients)
+        
+        # Use one model set for the whole request, even if new models are swapped in meanwhile
+        model_set = model_set or self.model_set
         
-        # Prepare input features
-        input_features = self.prepare_input_features(user_data)
+        if not model_set.models or not patients:
+            return [self.get_fallback_prediction(user_data) for user_data in patients]
+        
+        # Prepare one input matrix for the whole batch
+        input_features = self.prepare_input_batch(patients, model_set)
         
         if input_features is None:
-            return self.get_fallback_prediction(user_data)
+            return [self.get_fallback_prediction(user_data) for user_data in patients]
+        
+        # Answer repeated inputs from the cache and run the models for the rest only. The cache
+        # holds the serving models' results, so other model sets, e.g. ones being warmed up, skip it
+        cache_keys = self.get_prediction_cache_keys(patients, input_features, model_set)
+        results = [None] * len(patients)
+        misses = []
+        for i, (user_data, key) in enumerate(zip(patients, cache_keys)):
+            cached = self.prediction_cache.get(key) if model_set is self.model_set else None
+            if cached is None:
+                misses.append(i)
+            else:
+                results[i] = dict(cached, key_indicators=self.get_key_indicators(user_data, cached['predicted_disease']))
+        
+        # Symptom vectors seen often enough in training are answered from the lookup table
+        ensemble_rows = []
+        for i in misses:
+            results[i] = self.predict_from_exact_match(patients[i], cache_keys[i][0], model_set)
+            if results[i] is None:
+                ensemble_rows.append(i)
+        
+        if ensemble_rows:
+            ensemble_patients = [patients[i] for i in ensemble_rows]
+            ensemble_features = input_features[ensemble_rows]
+            if self.voting == 'soft':
+                predicted = self.soft_vote_batch(ensemble_patients, ensemble_features, model_set=model_set)
+            elif self.voting == 'cascade':
+                predicted = self.cascade_batch(ensemble_patients, ensemble_features, model_set=model_set,
+                                               latency_budget_ms=latency_budget_ms)
+            else:
+                predicted = self.hard_vote_batch(ensemble_patients, ensemble_features, model_set=model_set)
+            
+            for i, result in zip(ensemble_rows, predicted):
+                results[i] = result
+        
+        for i in misses:
+            if results[i]['answered_by'] not in FALLBACK_SOURCES:
+                results[i]['model_version'] = model_set.version
+        
+        # Results of models swapped out during the request are not cached, nor are cascade
+        # results cut short by a budget that only this request set
+        cacheable = model_set is self.model_set and (latency_budget_ms is None or self.voting != 'cascade')
+        for i in misses if cacheable else []:
+            if results[i]['answered_by'] not in FALLBACK_SOURCES:
+                # Key indicators quote the exact vitals, so they are rebuilt on every hit
+                self.prediction_cache.put(cache_keys[i], {k: v for k, v in results[i].items() if k != 'key_indicators'})
+        
+        return results
+    
+    def predict_from_exact_match(self, user_data, bitset, model_set=None):
+        """Answer from the training set's disease distribution for this exact symptom vector"""
+        model_set = model_set or self.model_set
+        if model_set.exact_match_index is None or self.exact_match_min_support is None:
+            return None
+        
+        match = model_set.exact_match_index.lookup(bitset, self.exact_match_min_support)
+        if match is None:
+            return None
+        
+        (predicted_disease, share), *others = match['distribution']
+        alternative_diseases = [
+            {'disease': disease, 'confidence': f"{other_share*100:.1f}%", 'model': 'ExactMatch'}
+            for disease, other_share in others[:3]
+        ]
+        return self.build_prediction_result(
+            user_data, predicted_disease, share * 100, alternative_diseases,
+            {'ExactMatch': predicted_disease}, answered_by='exact_match'
+        )
+    
+    def get_prediction_cache_keys(self, patients, input_features, model_set=None):
+        """Build cache keys from the packed symptom bitset and the bucketed vitals"""
+        symptom_encoder = (model_set or self.model_set).symptom_encoder
+        keys = []
+        for i, user_data in enumerate(patients):
+            columns = input_features.indices[input_features.indptr[i]:input_features.indptr[i + 1]]
+            keys.append((symptom_encoder.pack(columns),) + self.get_vitals_buckets(user_data))
+        return keys
+    
+    def get_vitals_buckets(self, user_data):
+        """Bucket vitals at the thresholds used for risk level and recommendations"""
+        age = user_data.get('age', 30)
+        bmi = user_data.get('bmi', 22)
+        temperature = user_data.get('temperature', 36.5)
+        
+        age_bucket = 0 if age < 18 else 2 if age > 65 else 1
+        bmi_bucket = 0 if bmi < 18.5 else 2 if bmi > 30 else 1
+        temperature_bucket = 2 if temperature > 38.5 else 1 if temperature > 37.5 else 0
+        many_symptoms = len(user_data.get('symptoms', [])) > 5
+        
+        return age_bucket, bmi_bucket, temperature_bucket, many_symptoms
+    
+    def get_cache_stats(self):
+        """Get hit/miss/eviction counters of the prediction cache"""
+        return dict(self.prediction_cache.get_stats(), model_version=self.model_version)
+    
+    def hard_vote_batch(self, patients, input_features, model_set=None):
+        """Majority vote over each model's predicted label"""
+        model_set = model_set or self.model_set
         
         # Get predictions from all models
-        predictions = {}
-        probabilities = {}
+        model_predictions = {}
+        model_probabilities = {}
         
-        for model_name, model in self.models.items():
+        for model_name, model in model_set.models.items():
             try:
-                pred = model.predict([input_features])[0]
-                proba = model.predict_proba([input_features])[0]
-                
-                # Convert prediction back to disease name
-                if 'diseases' in self.label_encoders:
-                    disease_name = self.label_encoders['diseases'].inverse_transform([pred])[0]
-                else:
-                    disease_name = str(pred)
+                preds = model.predict(input_features)
+                probas = model.predict_proba(input_features)
                 
-                predictions[model_name] = disease_name
-                probabilities[model_name] = max(proba)
+                model_predictions[model_name] = self.decode_labels(preds, model_set)
+                model_probabilities[model_name] = probas.max(axis=1)
                 
             except Exception as e:
                 print(f"Error with {model_name}: {e}")
                 continue
         
-        # Ensemble prediction (majority vote)
-        if predictions:
+        if not model_predictions:
+            return [self.get_fallback_prediction(user_data) for user_data in patients]
+        
+        results = []
+        for i, user_data in enumerate(patients):
+            predictions = {name: labels[i] for name, labels in model_predictions.items()}
+            probabilities = {name: probas[i] for name, probas in model_probabilities.items()}
+            
             # Count votes
             vote_count = {}
             for model_name, prediction in predictions.items():
@@ -151,54 +1128,260 @@ class DiseasePredictor:
             # Calculate average confidence
             confidence = np.mean([prob for prob in probabilities.values()]) * 100
             
-            # Get disease information
-            disease_info = self.disease_info.get(predicted_disease, {})
+            results.append(self.build_prediction_result(
+                user_data, predicted_disease, confidence,
+                self.get_alternative_diseases(predictions, probabilities), predictions
+            ))
+        
+        return results
+    
+    def soft_vote_batch(self, patients, input_features, top_k=3, model_set=None):
+        """Average class-aligned probabilities with a single predict_proba call per model"""
+        model_set = model_set or self.model_set
+        classes = self.get_ensemble_classes(model_set)
+        disease_names = np.array(self.decode_labels(classes, model_set), dtype=object)
+        
+        ensemble_proba = np.zeros((input_features.shape[0], len(classes)))
+        total_weight = 0.0
+        model_predictions = {}
+        
+        for model_name in model_set.models:
+            try:
+                proba = self.predict_proba_aligned(
+                    self.get_inference_model(model_name, input_features.shape[0], model_set), input_features, classes
+                )
+            except Exception as e:
+                print(f"Error with {model_name}: {e}")
+                continue
             
-            # Calculate risk level
-            risk_level = self.calculate_risk_level(user_data, predicted_disease)
+            weight = self.model_weights.get(model_name, 1.0)
+            ensemble_proba += weight * proba
+            total_weight += weight
+            model_predictions[model_name] = disease_names[proba.argmax(axis=1)]
+        
+        if not model_predictions or total_weight <= 0:
+            return [self.get_fallback_prediction(user_data) for user_data in patients]
+        
+        ensemble_proba /= total_weight
+        row_predictions = [
+            {name: labels[i] for name, labels in model_predictions.items()}
+            for i in range(len(patients))
+        ]
+        return self.build_ranked_results(patients, ensemble_proba, disease_names, row_predictions, top_k)
+    
+    def cascade_batch(self, patients, input_features, top_k=3, model_set=None, latency_budget_ms=None):
+        """Consult members from cheapest to costliest, escalating only uncertain rows
+        
+        A row moves on to the next stage while the top-two margin of its averaged
+        probabilities is below cascade_margin, as long as the expected cost of the
+        stage still fits in latency_budget_ms, which defaults to the predictor's.
+        """
+        model_set = model_set or self.model_set
+        if latency_budget_ms is None:
+            latency_budget_ms = self.latency_budget_ms
+        classes = self.get_ensemble_classes(model_set)
+        disease_names = np.array(self.decode_labels(classes, model_set), dtype=object)
+        n_rows = input_features.shape[0]
+        
+        proba_sum = np.zeros((n_rows, len(classes)))
+        weight_sum = np.zeros(n_rows)
+        row_predictions = [{} for _ in range(n_rows)]
+        active = np.arange(n_rows)
+        
+        stages = [name for name in self.cascade_order if name in model_set.models]
+        stages += [name for name in model_set.models if name not in stages]
+        start = time.perf_counter()
+        
+        for depth, model_name in enumerate(stages):
+            if depth > 0:
+                margins = self.get_margins(proba_sum[active], weight_sum[active])
+                escalated = active[margins < self.cascade_margin]
+                self.record_cascade_escalations(stages[depth - 1], len(active), len(escalated))
+                active = escalated
+                if not len(active):
+                    break
+                
+                if latency_budget_ms is not None:
+                    elapsed_ms = (time.perf_counter() - start) * 1000
+                    if elapsed_ms + self.estimate_stage_ms(model_name, len(active)) > latency_budget_ms:
+                        break
             
-            # Generate recommendations
-            recommendations = self.generate_recommendations(user_data, predicted_disease, disease_info)
+            stage_start = time.perf_counter()
+            try:
+                proba = self.predict_proba_aligned(
+                    self.get_inference_model(model_name, len(active), model_set), input_features[active], classes
+                )
+            except Exception as e:
+                print(f"Error with {model_name}: {e}")
+                continue
+            self.record_cascade_stage(model_name, len(active), time.perf_counter() - stage_start)
             
-            # Get alternative diseases
-            alternative_diseases = self.get_alternative_diseases(predictions, probabilities)
+            weight = self.model_weights.get(model_name, 1.0)
+            proba_sum[active] += weight * proba
+            weight_sum[active] += weight
+            for row, label in zip(active, disease_names[proba.argmax(axis=1)]):
+                row_predictions[row][model_name] = label
+        
+        if not (weight_sum > 0).all():
+            return [self.get_fallback_prediction(user_data) for user_data in patients]
+        
+        ensemble_proba = proba_sum / weight_sum[:, None]
+        return self.build_ranked_results(patients, ensemble_proba, disease_names, row_predictions, top_k,
+                                         answered_by='cascade')
+    
+    def get_margins(self, proba_sum, weight_sum):
+        """Gap between the two most probable classes of averaged probabilities, -inf if unscored"""
+        margins = np.full(len(weight_sum), -np.inf)
+        scored = weight_sum > 0
+        if proba_sum.shape[1] < 2:
+            margins[scored] = np.inf
+            return margins
+        
+        top_two = -np.partition(-proba_sum[scored], 1, axis=1)[:, :2]
+        margins[scored] = (top_two[:, 0] - top_two[:, 1]) / weight_sum[scored]
+        return margins
+    
+    def record_cascade_stage(self, model_name, n_rows, seconds):
+        """Record the latency of one cascade stage call"""
+        with self.cascade_stats_lock:
+            stats = self.cascade_stats.setdefault(model_name, {
+                'calls': 0, 'rows': 0, 'seconds': 0.0, 'escalated_rows': 0, 'recent_ms': deque(maxlen=1000)
+            })
+            stats['calls'] += 1
+            stats['rows'] += n_rows
+            stats['seconds'] += seconds
+            stats['recent_ms'].append(seconds * 1000)
+    
+    def record_cascade_escalations(self, model_name, n_rows, n_escalated):
+        """Record how many rows a stage passed on to the next one"""
+        with self.cascade_stats_lock:
+            if model_name in self.cascade_stats:
+                self.cascade_stats[model_name]['escalated_rows'] += n_escalated
+    
+    def estimate_stage_ms(self, model_name, n_rows):
+        """Estimate a stage's latency from its average cost per row so far"""
+        with self.cascade_stats_lock:
+            stats = self.cascade_stats.get(model_name)
+            if not stats or not stats['rows']:
+                return 0.0
+            return stats['seconds'] * 1000 / stats['rows'] * n_rows
+    
+    def get_cascade_stats(self):
+        """Get per-stage call counts, latency percentiles and escalation rates"""
+        with self.cascade_stats_lock:
+            report = {}
+            for model_name, stats in self.cascade_stats.items():
+                recent_ms = np.array(stats['recent_ms'])
+                report[model_name] = {
+                    'calls': stats['calls'],
+                    'rows': stats['rows'],
+                    'mean_ms': stats['seconds'] * 1000 / stats['calls'],
+                    'p50_ms': float(np.percentile(recent_ms, 50)),
+                    'p99_ms': float(np.percentile(recent_ms, 99)),
+                    'escalation_rate': stats['escalated_rows'] / stats['rows'] if stats['rows'] else 0.0,
+                    'model_version': self.model_version
+                }
+            return report
+    
+    def build_ranked_results(self, patients, ensemble_proba, disease_names, row_predictions, top_k,
+                             answered_by='ensemble'):
+        """Build results from a combined probability matrix, with ranked alternatives"""
+        ranked = self.rank_classes(ensemble_proba, top_k + 1)
+        
+        results = []
+        for i, user_data in enumerate(patients):
+            predicted_disease = disease_names[ranked[i, 0]]
+            alternative_diseases = [
+                {
+                    'disease': disease_names[j],
+                    'confidence': f"{ensemble_proba[i, j]*100:.1f}%",
+                    'model': 'Ensemble'
+                }
+                for j in ranked[i, 1:] if ensemble_proba[i, j] > 0
+            ]
             
-            return {
-                'predicted_disease': predicted_disease,
-                'confidence': confidence,
-                'risk_level': risk_level,
-                'disease_info': disease_info,
-                'recommendations': recommendations,
-                'alternative_diseases': alternative_diseases,
-                'key_indicators': self.get_key_indicators(user_data, predicted_disease),
-                'model_predictions': predictions
-            }
+            results.append(self.build_prediction_result(
+                user_data, predicted_disease, ensemble_proba[i, ranked[i, 0]] * 100,
+                alternative_diseases, row_predictions[i], answered_by=answered_by
+            ))
+        
+        return results
+    
+    def get_ensemble_classes(self, model_set=None):
+        """Get the encoded labels of all diseases, or the sorted union of the models' labels"""
+        model_set = model_set or self.model_set
+        if 'diseases' in model_set.label_encoders:
+            return np.arange(len(model_set.label_encoders['diseases'].classes_))
+        return np.unique(np.concatenate([model.classes_ for model in model_set.models.values()]))
+    
+    def predict_proba_aligned(self, model, input_features, classes):
+        """Get a model's probabilities with columns aligned to the ensemble classes"""
+        proba = model.predict_proba(input_features)
+        aligned = np.zeros((proba.shape[0], len(classes)))
+        aligned[:, np.searchsorted(classes, model.classes_)] = proba
+        return aligned
+    
+    def rank_classes(self, proba, k):
+        """Get the column indices of the k most probable classes per row, best first"""
+        k = min(k, proba.shape[1])
+        if k < proba.shape[1]:
+            top = np.argpartition(-proba, k - 1, axis=1)[:, :k]
         else:
-            return self.get_fallback_prediction(user_data)
+            top = np.tile(np.arange(proba.shape[1]), (proba.shape[0], 1))
+        order = np.argsort(-np.take_along_axis(proba, top, axis=1), axis=1, kind='stable')
+        return np.take_along_axis(top, order, axis=1)
+    
+    def decode_labels(self, encoded_labels, model_set=None):
+        """Convert encoded model outputs back to disease names"""
+        label_encoders = (model_set or self.model_set).label_encoders
+        if 'diseases' in label_encoders:
+            return label_encoders['diseases'].inverse_transform(encoded_labels).tolist()
+        return [str(label) for label in encoded_labels]
+    
+    def build_prediction_result(self, user_data, predicted_disease, confidence, alternative_diseases, predictions,
+                                answered_by='ensemble'):
+        """Assemble the prediction result for one patient"""
+        # Get disease information
+        disease_info = self.disease_info.get(predicted_disease, {})
+        
+        # Calculate risk level
+        risk_level = self.calculate_risk_level(user_data, predicted_disease)
+        
+        # Generate recommendations
+        recommendations = self.generate_recommendations(user_data, predicted_disease, disease_info)
+        
+        return {
+            'predicted_disease': predicted_disease,
+            'confidence': confidence,
+            'risk_level': risk_level,
+            'disease_info': disease_info,
+            'recommendations': recommendations,
+            'alternative_diseases': alternative_diseases,
+            'key_indicators': self.get_key_indicators(user_data, predicted_disease),
+            'model_predictions': predictions,
+            'answered_by': answered_by,
+            'model_version': None
+        }
     
     def prepare_input_features(self, user_data):
         """Prepare input features for prediction"""
-        if not self.symptom_columns:
+        symptom_encoder = self.model_set.symptom_encoder
+        if not symptom_encoder.n_features:
             return None
         
-        # Initialize feature vector
-        features = np.zeros(len(self.symptom_columns))
-        
-        # Map symptoms to features
-        symptoms = user_data.get('symptoms', [])
-        for i, symptom in enumerate(self.symptom_columns):
-            if symptom in symptoms:
-                features[i] = 1
-        
-        # Add additional symptoms if provided
-        additional_symptoms = user_data.get('additional_symptoms', '')
-        if additional_symptoms:
-            additional_list = [s.strip().lower() for s in additional_symptoms.split(',') if s.strip()]
-            for i, symptom in enumerate(self.symptom_columns):
-                if symptom.lower() in additional_list:
-                    features[i] = 1
+        return symptom_encoder.to_dense(symptom_encoder.encode(user_data))
+    
+    def prepare_input_matrix(self, user_data):
+        """Prepare input features as a 1-row CSR matrix"""
+        return self.prepare_input_batch([user_data])
+    
+    def prepare_input_batch(self, patients, model_set=None):
+        """Prepare input features for many patients as one CSR matrix"""
+        symptom_encoder = (model_set or self.model_set).symptom_encoder
+        if not symptom_encoder.n_features:
+            return None
         
-        return features
+        return symptom_encoder.to_csr([symptom_encoder.encode(user_data) for user_data in patients])
     
     def calculate_risk_level(self, user_data, predicted_disease):
         """Calculate risk level based on user data and predicted disease"""
@@ -353,6 +1536,10 @@ class DiseasePredictor:
     
     def get_fallback_prediction(self, user_data):
         """Fallback prediction when models are not available"""
+        result = self.predict_from_naive_bayes(user_data)
+        if result is not None:
+            return result
+        
         symptoms = user_data.get('symptoms', [])
         temperature = user_data.get('temperature', 36.5)
         
@@ -381,5 +1568,30 @@ class DiseasePredictor:
             ],
             'alternative_diseases': [],
             'key_indicators': [f"Presenting symptoms: {', '.join(symptoms)}"],
-            'model_predictions': {'Fallback': predicted_disease}
+            'model_predictions': {'Fallback': predicted_disease},
+            'answered_by': 'fallback',
+            'model_version': None
         }
+    
+    def predict_from_naive_bayes(self, user_data):
+        """Answer from the count-table naive Bayes engine, or None if it cannot"""
+        if self.naive_bayes is None:
+            return None
+        
+        try:
+            ranked = self.naive_bayes.predict_patient(user_data, top_k=4)
+        except Exception as e:
+            print(f"Naive Bayes prediction error: {e}")
+            return None
+        if ranked is None:
+            return None
+        
+        (predicted_disease, probability), *others = ranked
+        alternative_diseases = [
+            {'disease': disease, 'confidence': f"{other_probability*100:.1f}%", 'model': 'NaiveBayes'}
+            for disease, other_probability in others
+        ]
+        return self.build_prediction_result(
+            user_data, predicted_disease, probability * 100, alternative_diseases,
+            {'NaiveBayes': predicted_disease}, answered_by='naive_bayes'
+        )
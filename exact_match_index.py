@@ -0,0 +1,72 @@
+import numpy as np
+
+class ExactMatchIndex:
+    """Empirical disease distribution for every distinct symptom vector seen in training
+    
+    Vectors are keyed by their packed bitset (see SymptomEncoder.pack), so a lookup is a
+    single dictionary access. Distributions are stored in flat arrays, most frequent first.
+    """
+    
+    def __init__(self, diseases, keys, starts, disease_codes, counts):
+        self.diseases = list(diseases)
+        self.keys = keys
+        self.starts = starts
+        self.disease_codes = disease_codes
+        self.counts = counts
+        self.totals = np.add.reduceat(counts, starts[:-1]) if len(counts) else np.zeros(0, dtype=counts.dtype)
+        self.table = {key.tobytes(): i for i, key in enumerate(keys)}
+    
+    @classmethod
+    def build(cls, packed_rows, row_disease_codes, diseases, row_counts=None):
+        """Build the index from packed training rows and their disease codes
+        
+        row_counts gives how many original rows each row stands for when duplicates were collapsed.
+        """
+        packed_rows = np.ascontiguousarray(packed_rows)
+        row_view = packed_rows.view(np.dtype((np.void, packed_rows.shape[1]))).ravel()
+        _, first_rows, vector_ids = np.unique(row_view, return_index=True, return_inverse=True)
+        
+        # Count (vector, disease) pairs in one pass
+        pair_ids, pair_index, counts = np.unique(
+            vector_ids.ravel().astype(np.int64) * len(diseases) + row_disease_codes,
+            return_inverse=True, return_counts=True
+        )
+        if row_counts is not None:
+            counts = np.bincount(pair_index.ravel(), weights=row_counts, minlength=len(pair_ids)).astype(np.int64)
+        pair_vectors = pair_ids // len(diseases)
+        pair_diseases = pair_ids % len(diseases)
+        
+        # Most frequent disease first within each vector
+        order = np.lexsort((-counts, pair_vectors))
+        pair_vectors, pair_diseases, counts = pair_vectors[order], pair_diseases[order], counts[order]
+        starts = np.concatenate([np.flatnonzero(np.diff(pair_vectors, prepend=-1)), [len(pair_vectors)]])
+        
+        return cls(diseases, packed_rows[first_rows], starts, pair_diseases, counts)
+    
+    def lookup(self, bitset, min_support=1):
+        """Get the observed disease distribution for a bitset, or None without enough support"""
+        i = self.table.get(bitset)
+        if i is None or self.totals[i] < min_support:
+            return None
+        
+        start, end = self.starts[i], self.starts[i + 1]
+        total = self.totals[i]
+        return {
+            'support': int(total),
+            'distribution': [
+                (self.diseases[code], float(count / total))
+                for code, count in zip(self.disease_codes[start:end], self.counts[start:end])
+            ]
+        }
+    
+    def save(self, path):
+        """Save the index arrays to an .npz file"""
+        np.savez(path, diseases=np.array(self.diseases, dtype=str), keys=self.keys, starts=self.starts,
+                 disease_codes=self.disease_codes, counts=self.counts)
+    
+    @classmethod
+    def load(cls, path):
+        """Load an index saved with save()"""
+        with np.load(path) as data:
+            return cls(data['diseases'].tolist(), data['keys'], data['starts'],
+                       data['disease_codes'], data['counts'])
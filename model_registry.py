@@ -0,0 +1,186 @@
+import os
+import threading
+import time
+from collections import deque
+
+from model_store import (ARTIFACTS_DIR, ModelBundle, ModelSet, get_current_version, list_versions,
+                         set_current_version)
+
+class ModelRegistry:
+    """Hot-swaps artifact bundle versions into a running DiseasePredictor
+
+    A new version is loaded and warmed up next to the serving one and then swapped in
+    with a single assignment, so concurrent requests see either the old or the new
+    models. The replaced model set stays in memory for an instant rollback. Versions
+    that fail to verify or load are rejected, so the watcher does not retry them.
+    """
+
+    def __init__(self, predictor, root=ARTIFACTS_DIR, poll_interval=30, warmup_patients=None):
+        self.predictor = predictor
+        self.root = root
+        self.poll_interval = poll_interval
+        self.warmup_patients = warmup_patients
+        self.previous = None
+        self.rejected_versions = set()
+        self.loading_versions = set()
+        # Bumped by every rollback, so loads that started before one are not swapped in after it
+        self.rollback_generation = 0
+        self.history = deque(maxlen=50)
+        self.last_error = None
+        self.lock = threading.Lock()
+        self.stop_event = threading.Event()
+        self.watch_thread = None
+
+    def preload(self, version):
+        """Load and warm up a bundle version without serving it"""
+        bundle = ModelBundle.load(os.path.join(self.root, version), verify=True)
+        model_set = ModelSet.from_bundle(bundle, self.predictor.compiled_trees)
+        self.warm_up(model_set)
+        return model_set
+
+    def warm_up(self, model_set):
+        """Load every model and run a single-row and a batch prediction through them"""
+        for name in model_set.models:
+            model_set.models[name]
+
+        patients = self.warmup_patients or self.get_warmup_patients(model_set)
+        self.predictor.predict_disease_batch(patients[:1], model_set=model_set)
+        self.predictor.predict_disease_batch(patients, model_set=model_set)
+
+    def get_warmup_patients(self, model_set, n_patients=100):
+        """Build warm-up requests with one known symptom each"""
+        symptoms = model_set.symptom_columns[:n_patients] or ['fever']
+        return [{'symptoms': [symptom], 'additional_symptoms': ''} for symptom in symptoms]
+
+    def activate(self, version, follow_current=False):
+        """Preload a version and swap it in, keeping the serving models for rollback
+
+        Loading and warm-up run outside the lock, so rollbacks and update checks
+        never wait for a slow load; the lock only covers the swap. A rollback made
+        during the load wins and the loaded version is dropped; with follow_current,
+        as the watcher loads, so does a change of CURRENT. Returns None if the version
+        is already being loaded or was dropped.
+        """
+        start = time.perf_counter()
+        with self.lock:
+            if version in self.loading_versions:
+                return None
+            self.loading_versions.add(version)
+            generation = self.rollback_generation
+        try:
+            model_set = self.preload(version)
+        except Exception:
+            # A broken bundle stays broken; calling activate explicitly retries it
+            with self.lock:
+                self.rejected_versions.add(version)
+            raise
+        finally:
+            with self.lock:
+                self.loading_versions.discard(version)
+
+        with self.lock:
+            superseded = self.rollback_generation != generation or \
+                (follow_current and get_current_version(self.root) != version)
+            if superseded:
+                self.record('superseded', version, time.perf_counter() - start)
+            else:
+                self.previous = self.predictor.swap_model_set(model_set)
+                self.rejected_versions.discard(version)
+                self.record('activated', version, time.perf_counter() - start)
+
+        if superseded:
+            print(f"Dropped model version {version}: superseded while it was loading")
+            return None
+        print(f"Activated model version {version}")
+        return version
+
+    def activate_async(self, version):
+        """Preload and swap in a version from a background thread"""
+        thread = threading.Thread(target=self.run_safely, args=(self.activate, version),
+                                  name='model-activation', daemon=True)
+        thread.start()
+        return thread
+
+    def rollback(self):
+        """Swap the previous models back in and stop the watcher from re-activating the current ones"""
+        with self.lock:
+            if self.previous is None:
+                raise ValueError("No previous model version to roll back to")
+
+            start = time.perf_counter()
+            self.rollback_generation += 1
+            rolled_back = self.predictor.model_version
+            self.previous = self.predictor.swap_model_set(self.previous)
+            if rolled_back is not None:
+                self.rejected_versions.add(rolled_back)
+
+            # Point CURRENT back as well, so other processes and restarts follow the rollback
+            version = self.predictor.model_version
+            if version is not None and os.path.isdir(os.path.join(self.root, version)):
+                set_current_version(version, self.root)
+
+            self.record('rolled back', version, time.perf_counter() - start)
+            print(f"Rolled back from model version {rolled_back} to {version}")
+            return version
+
+    def check_for_update(self):
+        """Activate the version CURRENT points at if it is new; returns True if it swapped"""
+        version = get_current_version(self.root)
+        with self.lock:
+            if version is None or version == self.predictor.model_version or version in self.rejected_versions:
+                return False
+
+        return self.activate(version, follow_current=True) is not None
+
+    def start_watching(self):
+        """Poll CURRENT in a background thread and hot-swap new versions"""
+        if self.watch_thread is not None and self.watch_thread.is_alive():
+            return self.watch_thread
+
+        self.stop_event.clear()
+        self.watch_thread = threading.Thread(target=self.watch, name='model-registry', daemon=True)
+        self.watch_thread.start()
+        return self.watch_thread
+
+    def stop_watching(self):
+        """Stop the polling thread"""
+        self.stop_event.set()
+        if self.watch_thread is not None:
+            self.watch_thread.join()
+
+    def watch(self):
+        """Body of the polling thread"""
+        while not self.stop_event.wait(self.poll_interval):
+            self.run_safely(self.check_for_update)
+
+    def run_safely(self, func, *args):
+        """Run a registry operation, recording instead of raising its error"""
+        try:
+            return func(*args)
+        except Exception as e:
+            self.last_error = str(e)
+            self.record('failed', args[0] if args else None, 0.0, error=str(e))
+            print(f"Model registry error: {e}")
+
+    def record(self, event, version, seconds, error=None):
+        """Append an event to the swap history"""
+        self.history.append({
+            'event': event,
+            'version': version,
+            'time': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'seconds': seconds,
+            'error': error
+        })
+
+    def get_status(self):
+        """Get the serving and previous versions, the available versions and the swap history"""
+        return {
+            'current_version': self.predictor.model_version,
+            'previous_version': self.previous.version if self.previous is not None else None,
+            'available_versions': list_versions(self.root),
+            'rejected_versions': sorted(self.rejected_versions),
+            'loading_versions': sorted(self.loading_versions),
+            'watching': self.watch_thread is not None and self.watch_thread.is_alive(),
+            'last_error': self.last_error,
+            'history': list(self.history)
+        }
@@ -0,0 +1,246 @@
+import hashlib
+import json
+import os
+import shutil
+import threading
+import time
+from collections.abc import Mapping
+
+import joblib
+import numpy as np
+from sklearn.preprocessing import LabelEncoder
+
+from exact_match_index import ExactMatchIndex
+from symptom_encoder import SymptomEncoder
+from tree_engine import CompiledTreeEnsemble
+
+ARTIFACTS_DIR = 'model_artifacts'
+CURRENT_FILE = 'CURRENT'
+MANIFEST_FILE = 'manifest.json'
+BUNDLE_FORMAT = 1
+
+def file_sha256(path):
+    """Hash a file's content"""
+    sha256 = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            sha256.update(block)
+    return sha256.hexdigest()
+
+def directory_files(directory):
+    """List the files below a directory as sorted relative paths"""
+    files = []
+    for root, _, names in os.walk(directory):
+        for name in names:
+            files.append(os.path.relpath(os.path.join(root, name), directory))
+    return sorted(files)
+
+class LazyModels(Mapping):
+    """The models of a bundle, each loaded on first access
+
+    Models are stored uncompressed, so joblib memory-maps their large arrays and
+    worker processes loading the same bundle share those pages.
+    """
+
+    def __init__(self, directory, files, mmap_mode='r'):
+        self.directory = directory
+        self.files = dict(files)
+        self.mmap_mode = mmap_mode
+        self.loaded = {}
+        self.lock = threading.Lock()
+
+    def __getitem__(self, name):
+        model = self.loaded.get(name)
+        if model is not None:
+            return model
+        if name not in self.files:
+            raise KeyError(name)
+
+        with self.lock:
+            if name not in self.loaded:
+                path = os.path.join(self.directory, self.files[name])
+                self.loaded[name] = joblib.load(path, mmap_mode=self.mmap_mode)
+            return self.loaded[name]
+
+    def __iter__(self):
+        return iter(self.files)
+
+    def __len__(self):
+        return len(self.files)
+
+    def loaded_names(self):
+        """Names of the models loaded so far"""
+        return list(self.loaded)
+
+class ModelBundle:
+    """A versioned directory with one file per model and a manifest pinning its contents"""
+
+    def __init__(self, directory, manifest):
+        self.directory = directory
+        self.manifest = manifest
+        self.version = manifest['version']
+        self.feature_columns = manifest['feature_columns']
+        self.feature_aliases = manifest.get('feature_aliases', {})
+        self.label_encoder = LabelEncoder()
+        self.label_encoder.classes_ = np.array(manifest['label_classes'], dtype=object)
+        self.models = LazyModels(directory, {
+            name: entry['file'] for name, entry in manifest['models'].items()
+        })
+
+    @classmethod
+    def load(cls, directory, verify=False):
+        """Open a bundle; the models themselves load lazily"""
+        with open(os.path.join(directory, MANIFEST_FILE)) as f:
+            manifest = json.load(f)
+        if manifest.get('format') != BUNDLE_FORMAT:
+            raise ValueError(f"Unsupported model bundle format in {directory}")
+
+        bundle = cls(directory, manifest)
+        if verify and not bundle.verify():
+            raise ValueError(f"Model bundle {directory} does not match its manifest")
+        return bundle
+
+    def verify(self):
+        """Check every file against the hashes recorded in the manifest"""
+        return all(
+            file_sha256(os.path.join(self.directory, path)) == sha256
+            for path, sha256 in self.manifest['files'].items()
+        )
+
+    def load_compiled_models(self):
+        """Memory-map the compiled tree engines stored in the bundle"""
+        return {
+            name: CompiledTreeEnsemble.load(os.path.join(self.directory, path))
+            for name, path in self.manifest.get('compiled_models', {}).items()
+        }
+
+    def load_exact_match_index(self):
+        """Load the exact-match lookup table, if the bundle has one"""
+        path = self.manifest.get('exact_match_index')
+        if path is None:
+            return None
+        return ExactMatchIndex.load(os.path.join(self.directory, path))
+
+class ModelSet:
+    """One set of fitted models with the feature columns and labels they were trained on
+
+    DiseasePredictor replaces whole model sets, so a request never mixes two of them.
+    """
+
+    def __init__(self, models=None, symptom_columns=(), label_encoders=None, compiled_models=None,
+                 exact_match_index=None, version=None, feature_aliases=None):
+        self.models = models if models is not None else {}
+        self.symptom_columns = list(symptom_columns)
+        self.feature_aliases = dict(feature_aliases or {})
+        self.symptom_encoder = SymptomEncoder(self.symptom_columns, self.feature_aliases)
+        self.label_encoders = label_encoders or {}
+        self.compiled_models = compiled_models or {}
+        self.exact_match_index = exact_match_index
+        self.version = version
+
+    @classmethod
+    def from_bundle(cls, bundle, compiled_trees=True):
+        """Build a model set from an artifact bundle; its models still load lazily"""
+        return cls(
+            bundle.models, bundle.feature_columns, {'diseases': bundle.label_encoder},
+            compiled_models=bundle.load_compiled_models() if compiled_trees else {},
+            exact_match_index=bundle.load_exact_match_index(),
+            version=bundle.version,
+            feature_aliases=bundle.feature_aliases
+        )
+
+def save_bundle(models, feature_columns, label_encoder, compiled_models=None, exact_match_index=None,
+                root=ARTIFACTS_DIR, extra=None, feature_aliases=None):
+    """Write a new bundle version and make it the current one
+
+    Files are written into a temporary directory that is renamed into place once the
+    manifest is complete, so readers never see a partial bundle.
+    """
+    os.makedirs(root, exist_ok=True)
+    version = time.strftime('%Y%m%d-%H%M%S')
+    suffix = 1
+    while os.path.exists(os.path.join(root, version)):
+        suffix += 1
+        version = f"{time.strftime('%Y%m%d-%H%M%S')}-{suffix}"
+
+    tmp_directory = os.path.join(root, f".{version}.tmp")
+    os.makedirs(tmp_directory)
+    try:
+        model_entries = {}
+        for name, model in models.items():
+            filename = f"{name}.joblib"
+            joblib.dump(model, os.path.join(tmp_directory, filename))
+            model_entries[name] = {'file': filename, 'type': type(model).__name__}
+
+        compiled_entries = {}
+        for name, engine in (compiled_models or {}).items():
+            path = os.path.join('compiled', name)
+            engine.save(os.path.join(tmp_directory, path))
+            compiled_entries[name] = path
+
+        manifest = {
+            'format': BUNDLE_FORMAT,
+            'version': version,
+            'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'feature_columns': list(feature_columns),
+            'feature_aliases': dict(feature_aliases or {}),
+            'label_classes': [str(label) for label in label_encoder.classes_],
+            'models': model_entries,
+            'compiled_models': compiled_entries
+        }
+        if exact_match_index is not None:
+            exact_match_index.save(os.path.join(tmp_directory, 'exact_match_index.npz'))
+            manifest['exact_match_index'] = 'exact_match_index.npz'
+        if extra:
+            manifest.update(extra)
+
+        manifest['files'] = {
+            path: file_sha256(os.path.join(tmp_directory, path)) for path in directory_files(tmp_directory)
+        }
+        manifest['content_hash'] = hashlib.sha256(
+            json.dumps([manifest['feature_columns'], manifest['feature_aliases'], manifest['label_classes'],
+                        manifest['files']]).encode()
+        ).hexdigest()
+
+        with open(os.path.join(tmp_directory, MANIFEST_FILE), 'w') as f:
+            json.dump(manifest, f, indent=2)
+
+        directory = os.path.join(root, version)
+        os.rename(tmp_directory, directory)
+    except BaseException:
+        shutil.rmtree(tmp_directory, ignore_errors=True)
+        raise
+
+    set_current_version(version, root)
+    return directory
+
+def set_current_version(version, root=ARTIFACTS_DIR):
+    """Point CURRENT at a bundle version atomically"""
+    tmp_path = os.path.join(root, f"{CURRENT_FILE}.tmp")
+    with open(tmp_path, 'w') as f:
+        f.write(version)
+    os.replace(tmp_path, os.path.join(root, CURRENT_FILE))
+
+def get_current_version(root=ARTIFACTS_DIR):
+    """Get the version CURRENT points at, or None"""
+    try:
+        with open(os.path.join(root, CURRENT_FILE)) as f:
+            return f.read().strip() or None
+    except OSError:
+        return None
+
+def list_versions(root=ARTIFACTS_DIR):
+    """List the complete bundle versions, oldest first"""
+    if not os.path.isdir(root):
+        return []
+    return sorted(
+        name for name in os.listdir(root)
+        if os.path.exists(os.path.join(root, name, MANIFEST_FILE))
+    )
+
+def load_current_bundle(root=ARTIFACTS_DIR, verify=False):
+    """Open the current bundle, or None if there is none"""
+    version = get_current_version(root)
+    if version is None:
+        return None
+    return ModelBundle.load(os.path.join(root, version), verify=verify)
@@ -0,0 +1,91 @@
+import numpy as np
+from scipy import sparse
+
+# Number of set bits in every possible byte, for popcounts over packed bitsets
+POPCOUNT_TABLE = np.array([bin(i).count('1') for i in range(256)], dtype=np.uint8)
+
+class SymptomEncoder:
+    """Map symptom names to feature columns and encode symptom sets as packed bitsets
+    
+    Bitsets use the same layout as np.packbits (big-endian bits, zero padded), so a
+    bitset packed here equals the packed row of the training matrix for the same symptoms.
+    """
+    
+    def __init__(self, symptom_columns, aliases=None):
+        self.symptom_columns = list(symptom_columns)
+        self.n_features = len(self.symptom_columns)
+        self.n_bytes = (self.n_features + 7) // 8
+        self.column_index = {symptom: i for i, symptom in enumerate(self.symptom_columns)}
+        self.lower_column_index = {}
+        for i, symptom in enumerate(self.symptom_columns):
+            self.lower_column_index.setdefault(symptom.lower(), []).append(i)
+        
+        # Aliases map symptoms without a column of their own (e.g. merged rare ones) to a column
+        self.aliases = dict(aliases or {})
+        for symptom, column in self.aliases.items():
+            i = self.column_index[column]
+            self.column_index.setdefault(symptom, i)
+            self.lower_column_index.setdefault(symptom.lower(), []).append(i)
+    
+    def encode(self, user_data):
+        """Get the sorted column indices of the user's symptoms"""
+        columns = set()
+        
+        # Selected symptoms match column names exactly
+        for symptom in user_data.get('symptoms', []):
+            i = self.column_index.get(symptom)
+            if i is not None:
+                columns.add(i)
+        
+        # Free-text additional symptoms match case-insensitively
+        additional_symptoms = user_data.get('additional_symptoms', '')
+        if additional_symptoms:
+            for symptom in additional_symptoms.split(','):
+                columns.update(self.lower_column_index.get(symptom.strip().lower(), ()))
+        
+        return np.array(sorted(columns), dtype=np.intp)
+    
+    def pack(self, columns):
+        """Pack column indices into a hashable bitset"""
+        bitset = bytearray(self.n_bytes)
+        for i in columns:
+            bitset[i >> 3] |= 0x80 >> (i & 7)
+        return bytes(bitset)
+    
+    def unpack(self, bitset):
+        """Get the column indices set in a packed bitset"""
+        bits = np.unpackbits(np.frombuffer(bitset, dtype=np.uint8), count=self.n_features)
+        return np.flatnonzero(bits)
+    
+    def to_dense(self, columns):
+        """Convert column indices to a dense feature vector"""
+        features = np.zeros(self.n_features)
+        features[columns] = 1
+        return features
+    
+    def to_csr(self, rows):
+        """Convert a list of column index arrays to a CSR feature matrix"""
+        indptr = np.concatenate([[0], np.cumsum([len(columns) for columns in rows])])
+        indices = np.concatenate(rows) if rows else np.array([], dtype=np.intp)
+        return sparse.csr_matrix(
+            (np.ones(len(indices)), indices, indptr),
+            shape=(len(rows), self.n_features)
+        )
+    
+    def pack_matrix(self, X):
+        """Pack every row of a binary feature matrix into bitsets, one uint8 row each"""
+        if sparse.issparse(X):
+            coo = X.tocoo()
+            nonzero = coo.data != 0
+            rows, columns = coo.row[nonzero], coo.col[nonzero].astype(np.intp)
+            packed = np.zeros((X.shape[0], self.n_bytes), dtype=np.uint8)
+            np.bitwise_or.at(packed, (rows, columns >> 3), (0x80 >> (columns & 7)).astype(np.uint8))
+            return packed
+        return np.packbits(np.asarray(X) != 0, axis=1)
+    
+    def jaccard_similarity(self, bitset, packed_matrix):
+        """Jaccard similarity between one bitset and every row of a packed matrix"""
+        query = np.frombuffer(bitset, dtype=np.uint8)
+        intersection = POPCOUNT_TABLE[packed_matrix & query].sum(axis=1, dtype=np.int64)
+        union = POPCOUNT_TABLE[packed_matrix | query].sum(axis=1, dtype=np.int64)
+        return np.divide(intersection, union, out=np.ones(len(union)), where=union > 0)
@@ -0,0 +1,113 @@
+import numpy as np
+from scipy.special import expit
+
+def binary_entropy(p):
+    """Entropy in bits of Bernoulli variables with probabilities p"""
+    p = np.clip(p, 1e-12, 1 - 1e-12)
+    return -(p * np.log2(p) + (1 - p) * np.log2(1 - p))
+
+class SymptomQuestioner:
+    """Rank the symptoms worth asking about next by expected information gain
+
+    The gain of asking about symptom j is the mutual information between the answer
+    and the disease under the current posterior pi over diseases:
+
+        IG_j = H(sum_d pi_d P[d, j]) - sum_d pi_d H(P[d, j])
+
+    with H the binary entropy and P the per-disease symptom probabilities. Both terms
+    are one vector-matrix product over all candidate symptoms, and H(P) is precomputed.
+
+    P and the posterior come from a NaiveBayesEngine, whose log tables are shared
+    rather than copied; only P and H(P) are added, and rebuilt when the engine changes.
+    """
+
+    def __init__(self, engine):
+        self.engine = engine
+        # (engine tables, log prior, P, H(P)), swapped as one tuple
+        self.tables = None
+        self.get_tables()
+
+    @classmethod
+    def from_counts(cls, diseases, symptom_columns, symptom_counts, row_counts, alpha=1.0):
+        """Build over a naive Bayes engine of its own from per-disease symptom counts"""
+        from disease_predictor import NaiveBayesEngine
+        return cls(NaiveBayesEngine(diseases, symptom_columns, symptom_counts, row_counts, alpha))
+
+    @classmethod
+    def from_engine(cls, engine):
+        """Build over an existing naive Bayes engine, or None without one"""
+        return cls(engine) if engine is not None else None
+
+    @property
+    def symptom_columns(self):
+        return self.engine.symptom_columns
+
+    @property
+    def diseases(self):
+        return self.get_tables()[0][0]
+
+    @property
+    def symptom_probabilities(self):
+        return self.get_tables()[2]
+
+    def get_tables(self):
+        """Get the engine's tables with the log prior, P and H(P) derived from them"""
+        engine_tables = self.engine.tables
+        tables = self.tables
+        if tables is None or tables[0] is not engine_tables:
+            _, log_odds, base = engine_tables
+            # The engine keeps log(p / (1 - p)) per symptom and disease, and log(1 - p) = -log(1 + e^log_odds)
+            log_prior = base + np.logaddexp(0, log_odds).sum(axis=0)
+            probabilities = np.ascontiguousarray(expit(log_odds.T))
+            tables = (engine_tables, log_prior, probabilities, binary_entropy(probabilities))
+            self.tables = tables
+        return tables
+
+    def posterior(self, present, absent=(), tables=None):
+        """Disease posterior given the symptoms answered yes and no; unasked symptoms are ignored"""
+        (_, log_odds, _), log_prior, _, _ = tables or self.get_tables()
+        present_odds = log_odds[np.asarray(present, dtype=np.intp)]
+        absent_odds = log_odds[np.asarray(absent, dtype=np.intp)]
+        log_posterior = (log_prior
+                         + (present_odds - np.logaddexp(0, present_odds)).sum(axis=0)
+                         - np.logaddexp(0, absent_odds).sum(axis=0))
+        posterior = np.exp(log_posterior - log_posterior.max())
+        return posterior / posterior.sum()
+
+    def information_gain(self, posterior, tables=None):
+        """Expected information gain in bits of asking about every symptom"""
+        _, _, probabilities, entropy = tables or self.get_tables()
+        answer_yes = posterior @ probabilities
+        return binary_entropy(answer_yes) - posterior @ entropy, answer_yes
+
+    def suggest(self, symptoms, denied_symptoms=(), additional_symptoms='', top_k=5):
+        """Rank the next symptoms to ask about
+
+        symptoms are the ones the patient reported, denied_symptoms those they said they
+        do not have. Returns up to top_k dicts with the symptom, its information gain in
+        bits and the probability that the patient has it.
+        """
+        encoder = self.engine.symptom_encoder
+        present = encoder.encode({'symptoms': symptoms, 'additional_symptoms': additional_symptoms})
+        absent = encoder.encode({'symptoms': denied_symptoms})
+
+        # One snapshot for both steps, in case the engine is updated meanwhile
+        tables = self.get_tables()
+        posterior = self.posterior(present, absent, tables)
+        gain, answer_yes = self.information_gain(posterior, tables)
+        gain[present] = -np.inf
+        gain[absent] = -np.inf
+
+        k = min(top_k, len(gain) - len(np.union1d(present, absent)))
+        if k <= 0:
+            return []
+        top = np.argpartition(-gain, k - 1)[:k]
+        top = top[np.argsort(-gain[top])]
+        return [
+            {
+                'symptom': self.symptom_columns[j],
+                'information_gain': float(gain[j]),
+                'probability': float(answer_yes[j])
+            }
+            for j in top
+        ]
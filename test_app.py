@@ -18,6 +18,8 @@ def test_imports():
         from recommendation_system import RecommendationSystem
         from routine_generator import RoutineGenerator
         from visualization import Visualization
+        from prediction_cache import PredictionCache
+        from symptom_encoder import SymptomEncoder
         print("✅ All modules imported successfully")
         return True
     except Exception as e:
@@ -40,6 +42,168 @@ def test_data_processor():
         print(f"❌ DataProcessor error: {e}")
         return False
 
+def test_symptom_matrix_loader():
+    """Test chunked, typed loading of the symptom matrix"""
+    try:
+        import tempfile
+        import numpy as np
+        from data_processor import read_symptom_matrix
+        
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, 'symptoms.csv')
+            with open(path, 'w') as f:
+                f.write("diseases, fever ,cough\nFlu,1,1\nCold,0,\nFlu,1,0\n")
+            
+            data = read_symptom_matrix(path, chunksize=2)
+        
+        assert data.columns.tolist() == ['diseases', 'fever', 'cough'], "Column names not cleaned"
+        assert data['fever'].dtype == np.uint8 and data['cough'].dtype == np.uint8, "Symptoms not uint8"
+        assert str(data['diseases'].dtype) == 'category', "Diseases not categorical"
+        assert data['cough'].tolist() == [1, 0, 0], "Missing values not filled"
+        
+        print(f"✅ Symptom matrix loader: {len(data)} rows typed as uint8/category")
+        return True
+    except Exception as e:
+        print(f"❌ Symptom matrix loader error: {e}")
+        return False
+
+def test_data_cache():
+    """Test the fingerprinted on-disk cache of the symptom matrix"""
+    cwd = os.getcwd()
+    try:
+        import tempfile
+        from data_processor import DataProcessor, SYMPTOMS_DATA_FILE
+        
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            os.chdir(tmp_dir)
+            with open(SYMPTOMS_DATA_FILE, 'w') as f:
+                f.write("diseases,fever,cough\nFlu,1,1\nCold,0,1\n")
+            with open('health_dataset.csv', 'w') as f:
+                f.write("age\n30\n")
+            with open('Symptom-severity.csv', 'w') as f:
+                f.write("Symptom,weight\nfever,5\n")
+            
+            processor = DataProcessor()
+            assert processor.is_cache_valid(), "Cache not written"
+            cached = processor.load_cached_symptoms()
+            assert cached.equals(processor.symptoms_data), "Cached data differs from CSV"
+            
+            with open(SYMPTOMS_DATA_FILE, 'w') as f:
+                f.write("diseases,fever,cough\nFlu,1,1\nCold,0,1\nFlu,1,0\n")
+            assert not processor.is_cache_valid(), "Cache not invalidated after change"
+            assert len(DataProcessor().symptoms_data) == 3, "Cache not rebuilt"
+        
+        print("✅ Data cache: reused while valid and rebuilt after changes")
+        return True
+    except Exception as e:
+        print(f"❌ Data cache error: {e}")
+        return False
+    finally:
+        os.chdir(cwd)
+
+def test_sample_data_fallback():
+    """Test the fallback to sample data when loading fails after the symptom matrix was read"""
+    cwd = os.getcwd()
+    try:
+        import tempfile
+        from data_processor import DataProcessor, SYMPTOMS_DATA_FILE
+        
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            os.chdir(tmp_dir)
+            with open(SYMPTOMS_DATA_FILE, 'w') as f:
+                f.write("diseases,fever,cough\n" + "".join(f"Disease{i % 3},1,{i % 2}\n" for i in range(9)))
+            
+            # The health dataset is missing
+            processor = DataProcessor(cache_dir=None)
+            assert len(processor.symptoms_data) == 5, "Sample data not used"
+            assert processor.get_symptom_matrix().shape == (5, 5), "Stale symptom matrix kept"
+            assert processor.get_disease_symptoms('Flu') == ['fever', 'cough', 'headache', 'fatigue', 'sore_throat']
+            assert 'Disease0' not in processor.disease_index, "Stale disease profiles kept"
+            
+            # The severity file has no Symptom column
+            with open('health_dataset.csv', 'w') as f:
+                f.write("age\n30\n")
+            with open('Symptom-severity.csv', 'w') as f:
+                f.write("Name,weight\nfever,5\n")
+            processor = DataProcessor(cache_dir=None)
+            assert processor.get_diseases_list() == ['Common Cold', 'Cough', 'Fever', 'Flu', 'Headache']
+            assert processor.get_symptom_severity('fever') == 5
+        
+        print("✅ Sample data fallback: recovers after a partial load")
+        return True
+    except Exception as e:
+        print(f"❌ Sample data fallback error: {e}")
+        return False
+    finally:
+        os.chdir(cwd)
+
+def test_disease_profiles():
+    """Test per-disease symptom sets and prevalence, loaded and built from counts"""
+    cwd = os.getcwd()
+    try:
+        import tempfile
+        import numpy as np
+        from data_processor import DataProcessor, SYMPTOMS_DATA_FILE
+        
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            os.chdir(tmp_dir)
+            with open(SYMPTOMS_DATA_FILE, 'w') as f:
+                f.write("diseases,fever,cough,headache\nFlu,1,1,0\nFlu,1,0,0\nCold,0,1,0\nFlu,1,0,0\n"
+                        "Flu,0,0,0\nCold,0,0,0\n")
+            with open('health_dataset.csv', 'w') as f:
+                f.write("age\n30\n")
+            with open('Symptom-severity.csv', 'w') as f:
+                f.write("Symptom,weight\nfever,5\n")
+            processor = DataProcessor(cache_dir=None)
+        
+        # A symptom belongs to a disease when any of its rows shows it
+        assert processor.get_disease_symptoms('Flu') == ['fever', 'cough']
+        assert processor.get_disease_symptoms('Cold') == ['cough']
+        assert processor.get_disease_symptoms('Unknown') == []
+        assert processor.get_disease_symptom_prevalence('Flu') == {'fever': 0.75, 'cough': 0.25}
+        assert processor.get_disease_symptom_prevalence('Cold') == {'cough': 0.5}
+        assert processor.get_disease_symptom_prevalence('Unknown') == {}
+        
+        # Profiles counted elsewhere, as streaming training does, without a symptom matrix
+        counted = DataProcessor.from_disease_profiles(
+            processor.profile_diseases, ['fever', 'cough', 'headache'],
+            processor.disease_symptom_counts, processor.disease_row_counts
+        )
+        assert counted.get_disease_symptoms('Flu') == ['fever', 'cough']
+        assert counted.get_disease_symptom_prevalence('Flu') == {'fever': 0.75, 'cough': 0.25}
+        assert np.array_equal(counted.disease_row_counts, [2, 4])
+        
+        print("✅ Disease profiles: symptom sets and prevalence per disease")
+        return True
+    except Exception as e:
+        print(f"❌ Disease profiles error: {e}")
+        return False
+    finally:
+        os.chdir(cwd)
+
+def test_symptom_scoring():
+    """Test that batch symptom scoring matches per-patient scoring"""
+    try:
+        from data_processor import DataProcessor
+        processor = DataProcessor()
+        
+        patients = [
+            {'symptoms': ['fever', 'Sore Throat'], 'additional_symptoms': 'cough, unknown'},
+            {'symptoms': []},
+            {'symptoms': ['HEADACHE'], 'additional_symptoms': ''}
+        ]
+        
+        total_scores, symptom_counts = processor.calculate_symptom_scores(patients)
+        for patient, total_score, symptom_count in zip(patients, total_scores, symptom_counts):
+            expected = processor.calculate_symptom_score(patient['symptoms'], patient.get('additional_symptoms', ''))
+            assert (total_score, symptom_count) == expected, f"Batch score {total_score} != {expected}"
+        
+        print(f"✅ Symptom scoring: batch scores {total_scores.tolist()} match single scoring")
+        return True
+    except Exception as e:
+        print(f"❌ Symptom scoring error: {e}")
+        return False
+
 def test_disease_predictor():
     """Test DiseasePredictor functionality"""
     try:
@@ -66,6 +230,816 @@ def test_disease_predictor():
         print(f"❌ DiseasePredictor error: {e}")
         return False
 
+def test_batch_prediction():
+    """Test that batch prediction matches single predictions"""
+    try:
+        from disease_predictor import DiseasePredictor
+        predictor = DiseasePredictor()
+        
+        patients = [
+            {'age': 30, 'bmi': 24.2, 'temperature': 37.2, 'symptoms': ['fever', 'cough'], 'additional_symptoms': ''},
+            {'age': 70, 'bmi': 31.0, 'temperature': 39.0, 'symptoms': ['headache'], 'additional_symptoms': 'Fatigue'},
+            {'age': 15, 'bmi': 17.0, 'temperature': 36.5, 'symptoms': [], 'additional_symptoms': ''}
+        ]
+        
+        batch_results = predictor.predict_disease_batch(patients)
+        assert len(batch_results) == len(patients), "Wrong number of batch results"
+        for user_data, batch_result in zip(patients, batch_results):
+            single_result = predictor.predict_disease(user_data)
+            assert batch_result['predicted_disease'] == single_result['predicted_disease'], "Batch prediction differs"
+            assert batch_result['confidence'] == single_result['confidence'], "Batch confidence differs"
+        
+        print(f"✅ Batch prediction: {len(batch_results)} patients match single predictions")
+        return True
+    except Exception as e:
+        print(f"❌ Batch prediction error: {e}")
+        return False
+
+STUB_SYMPTOMS = ['fever', 'cough', 'headache', 'rash']
+STUB_DISEASES = ['Cold', 'Flu', 'Migraine']
+
+class StubModel:
+    """Classifier stand-in whose probabilities depend on the first symptom, counting its calls"""
+    
+    def __init__(self, classes, fever_proba, other_proba, delay=0.0):
+        import numpy as np
+        self.classes_ = np.asarray(classes)
+        self.fever_proba = np.asarray(fever_proba, dtype=float)
+        self.other_proba = np.asarray(other_proba, dtype=float)
+        self.delay = delay
+        self.calls = 0
+        self.rows = 0
+    
+    def predict_proba(self, X):
+        import time
+        import numpy as np
+        self.calls += 1
+        self.rows += X.shape[0]
+        time.sleep(self.delay)
+        has_fever = np.asarray(X[:, 0].todense()).ravel() > 0
+        return np.where(has_fever[:, None], self.fever_proba, self.other_proba)
+    
+    def predict(self, X):
+        return self.classes_[self.predict_proba(X).argmax(axis=1)]
+
+def make_stub_predictor(models, exact_match_index=None, **predictor_params):
+    """Build a predictor that serves stub models; call it from inside a temporary directory"""
+    import numpy as np
+    from sklearn.linear_model import LogisticRegression
+    from sklearn.preprocessing import LabelEncoder
+    from disease_predictor import DiseasePredictor
+    from model_store import ModelSet, save_bundle
+    
+    # A saved bundle keeps the predictor from training on startup
+    label_encoder = LabelEncoder().fit(STUB_DISEASES)
+    save_bundle({'LogisticRegression': LogisticRegression().fit(np.eye(4)[:3], [0, 1, 2])},
+                STUB_SYMPTOMS, label_encoder)
+    predictor = DiseasePredictor(**predictor_params)
+    predictor.swap_model_set(ModelSet(models, STUB_SYMPTOMS, {'diseases': label_encoder},
+                                      exact_match_index=exact_match_index))
+    return predictor
+
+def test_soft_voting():
+    """Test that soft voting averages class-aligned probabilities with one call per model"""
+    cwd = os.getcwd()
+    try:
+        import tempfile
+        import numpy as np
+        
+        # The second model never saw Flu, so its two columns must land on Cold and Migraine
+        full = StubModel([0, 1, 2], [0.5, 0.3, 0.2], [0.2, 0.2, 0.6])
+        partial = StubModel([0, 2], [0.6, 0.4], [0.1, 0.9])
+        patients = [{'symptoms': ['fever']}, {'symptoms': ['cough']}, {'symptoms': ['fever', 'rash']}]
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            os.chdir(tmp_dir)
+            predictor = make_stub_predictor({'Full': full, 'Partial': partial}, voting='soft',
+                                            exact_match_min_support=None)
+            
+            fever, cough, fever_rash = predictor.predict_disease_batch(patients)
+            assert (full.calls, partial.calls) == (1, 1), "predict_proba not called once per model"
+            # Fever: Cold (0.5 + 0.6) / 2, Flu (0.3 + 0) / 2, Migraine (0.2 + 0.4) / 2
+            assert fever['predicted_disease'] == 'Cold' and np.isclose(fever['confidence'], 55.0)
+            assert [(alt['disease'], alt['confidence']) for alt in fever['alternative_diseases']] == \
+                [('Migraine', '30.0%'), ('Flu', '15.0%')], f"Alternatives {fever['alternative_diseases']}"
+            assert fever['model_predictions'] == {'Full': 'Cold', 'Partial': 'Cold'}
+            # Cough: Migraine (0.6 + 0.9) / 2
+            assert cough['predicted_disease'] == 'Migraine' and np.isclose(cough['confidence'], 75.0)
+            assert fever_rash['predicted_disease'] == 'Cold'
+            
+            # Weights scale each model's share of the average
+            predictor.model_weights = {'Partial': 3.0}
+            predictor.prediction_cache.clear()
+            weighted = predictor.predict_disease(patients[0])
+            assert np.isclose(weighted['confidence'], (0.5 + 3 * 0.6) / 4 * 100), f"Confidence {weighted['confidence']}"
+            
+            assert predictor.rank_classes(np.array([[0.1, 0.5, 0.4]]), 2).tolist() == [[1, 2]]
+        
+        print("✅ Soft voting: aligned probabilities averaged with one predict_proba call per model")
+        return True
+    except Exception as e:
+        print(f"❌ Soft voting error: {e}")
+        return False
+    finally:
+        os.chdir(cwd)
+
+def test_predictor_cache():
+    """Test that repeated queries hit the prediction cache and a model swap invalidates it"""
+    cwd = os.getcwd()
+    try:
+        import tempfile
+        from model_store import ModelSet
+        
+        old_model = StubModel([0, 1, 2], [0.8, 0.1, 0.1], [0.1, 0.1, 0.8])
+        new_model = StubModel([0, 1, 2], [0.1, 0.8, 0.1], [0.1, 0.1, 0.8])
+        patient = {'symptoms': ['fever'], 'age': 30, 'temperature': 101.2}
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            os.chdir(tmp_dir)
+            predictor = make_stub_predictor({'Old': old_model}, exact_match_min_support=None)
+            
+            first = predictor.predict_disease(patient)
+            second = predictor.predict_disease(dict(patient))
+            assert first['predicted_disease'] == second['predicted_disease'] == 'Cold'
+            assert old_model.calls == 1, f"Repeated query reached the model ({old_model.calls} calls)"
+            stats = predictor.get_cache_stats()
+            assert (stats['hits'], stats['misses'], stats['size']) == (1, 1, 1), f"Stats {stats}"
+            
+            # Warming up a model set that is not serving runs its models, not the serving cache
+            warmed = predictor.predict_disease_batch([patient], model_set=ModelSet(
+                {'New': new_model}, STUB_SYMPTOMS, predictor.model_set.label_encoders))[0]
+            assert warmed['predicted_disease'] == 'Flu' and new_model.calls == 1, "Warm-up answered from the cache"
+            assert predictor.get_cache_stats()['hits'] == 1, "Warm-up counted as a cache hit"
+            new_model.calls = 0
+            
+            # The same query must be answered by the new models, not the cached entry
+            predictor.swap_model_set(ModelSet({'New': new_model}, STUB_SYMPTOMS,
+                                              predictor.model_set.label_encoders))
+            assert predictor.get_cache_stats()['size'] == 0, "Swap left cached predictions behind"
+            swapped = predictor.predict_disease(patient)
+            assert swapped['predicted_disease'] == 'Flu', f"Stale prediction {swapped['predicted_disease']}"
+            assert (old_model.calls, new_model.calls) == (1, 1)
+            assert predictor.predict_disease(patient)['predicted_disease'] == 'Flu' and new_model.calls == 1
+        
+        print("✅ Predictor cache: repeated queries served from cache, cleared on model swap")
+        return True
+    except Exception as e:
+        print(f"❌ Predictor cache error: {e}")
+        return False
+    finally:
+        os.chdir(cwd)
+
+def test_cascade_voting():
+    """Test margin-gated escalation, the latency budget and the cascade statistics"""
+    cwd = os.getcwd()
+    try:
+        import tempfile
+        import numpy as np
+        
+        # The cheap stage is sure about fever and torn otherwise; the costly stage always says Flu
+        cheap = StubModel([0, 1, 2], [0.9, 0.05, 0.05], [0.4, 0.35, 0.25])
+        costly = StubModel([0, 1, 2], [0.1, 0.8, 0.1], [0.1, 0.8, 0.1], delay=0.05)
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            os.chdir(tmp_dir)
+            predictor = make_stub_predictor({'RandomForest': costly, 'NaiveBayes': cheap}, voting='cascade',
+                                            cascade_margin=0.2, latency_budget_ms=20,
+                                            exact_match_min_support=None)
+            
+            confident, uncertain = predictor.predict_disease_batch([{'symptoms': ['fever']}, {'symptoms': ['cough']}])
+            assert confident['predicted_disease'] == 'Cold' and confident['model_predictions'] == {'NaiveBayes': 'Cold'}, \
+                "Confident row escalated"
+            assert uncertain['predicted_disease'] == 'Flu', "Uncertain row not escalated"
+            assert np.isclose(uncertain['confidence'], (0.35 + 0.8) / 2 * 100), f"Confidence {uncertain['confidence']}"
+            assert (cheap.rows, costly.rows) == (2, 1), f"Stages saw {cheap.rows} and {costly.rows} rows"
+            
+            # The costly stage has now measured ~50ms per row, beyond the 20ms budget
+            budgeted = predictor.predict_disease({'symptoms': ['headache']})
+            assert costly.calls == 1, "Stage run beyond the latency budget"
+            assert budgeted['model_predictions'] == {'NaiveBayes': 'Cold'}, "Budgeted row not answered by cheap stage"
+            
+            # A per-request budget overrides the predictor's, and its results are not cached
+            cached_entries = predictor.get_cache_stats()['size']
+            generous = predictor.predict_disease({'symptoms': ['rash']}, latency_budget_ms=1000)
+            assert costly.calls == 2 and generous['predicted_disease'] == 'Flu', "Per-request budget ignored"
+            tight = predictor.predict_disease_batch([{'symptoms': ['rash']}], latency_budget_ms=20)[0]
+            assert costly.calls == 2 and tight['model_predictions'] == {'NaiveBayes': 'Cold'}
+            assert predictor.get_cache_stats()['size'] == cached_entries, "Per-request budget result cached"
+            
+            stats = predictor.get_cascade_stats()
+            assert stats['NaiveBayes']['rows'] == 5 and stats['RandomForest']['rows'] == 2
+            assert np.isclose(stats['NaiveBayes']['escalation_rate'], 4 / 5), f"Escalation rate {stats['NaiveBayes']}"
+            assert stats['RandomForest']['p50_ms'] >= 50 and stats['RandomForest']['p99_ms'] >= stats['RandomForest']['p50_ms']
+            
+            margins = predictor.get_margins(np.array([[0.9, 0.1, 0.0], [0.8, 0.4, 0.8], [0.0, 0.0, 0.0]]),
+                                            np.array([1.0, 2.0, 0.0]))
+            assert np.allclose(margins[:2], [0.8, 0.0]) and margins[2] == -np.inf, f"Margins {margins}"
+        
+        print(f"✅ Cascade voting: 1 of 2 rows escalated, budget enforced, "
+              f"p50 {stats['RandomForest']['p50_ms']:.0f}ms for the costly stage")
+        return True
+    except Exception as e:
+        print(f"❌ Cascade voting error: {e}")
+        return False
+    finally:
+        os.chdir(cwd)
+
+def test_exact_match_index():
+    """Test the exact-match lookup table and when the predictor answers from it"""
+    cwd = os.getcwd()
+    try:
+        import tempfile
+        import numpy as np
+        from exact_match_index import ExactMatchIndex
+        from symptom_encoder import SymptomEncoder
+        
+        # Deduplicated rows: fever alone stands for 3 Cold, 1 Cold and 2 Flu rows; cough alone for 2 Migraine
+        encoder = SymptomEncoder(STUB_SYMPTOMS)
+        X = np.array([[1, 0, 0, 0], [1, 0, 0, 0], [1, 0, 0, 0], [0, 1, 0, 0]])
+        index = ExactMatchIndex.build(encoder.pack_matrix(X), np.array([0, 0, 1, 2]), STUB_DISEASES,
+                                      row_counts=np.array([3, 1, 2, 2]))
+        
+        fever = encoder.pack(encoder.encode({'symptoms': ['fever']}))
+        match = index.lookup(fever, min_support=6)
+        assert match['support'] == 6, f"Support {match['support']}"
+        assert [disease for disease, _ in match['distribution']] == ['Cold', 'Flu']
+        assert np.allclose([share for _, share in match['distribution']], [4 / 6, 2 / 6])
+        assert index.lookup(fever, min_support=7) is None, "Lookup ignored min_support"
+        assert index.lookup(encoder.pack(encoder.encode({'symptoms': ['rash']}))) is None, "Unseen vector matched"
+        
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            os.chdir(tmp_dir)
+            model = StubModel([0, 1, 2], [0.2, 0.7, 0.1], [0.1, 0.2, 0.7])
+            predictor = make_stub_predictor({'NaiveBayes': model}, exact_match_index=index,
+                                            exact_match_min_support=5)
+            
+            # Enough support: answered from the table without running the model
+            result = predictor.predict_disease({'symptoms': ['fever']})
+            assert result['answered_by'] == 'exact_match' and result['predicted_disease'] == 'Cold'
+            assert np.isclose(result['confidence'], 4 / 6 * 100) and model.calls == 0
+            assert result['alternative_diseases'][0]['disease'] == 'Flu'
+            
+            # Too little support: the ensemble answers
+            result = predictor.predict_disease({'symptoms': ['cough']})
+            assert result['answered_by'] == 'ensemble' and result['predicted_disease'] == 'Migraine'
+            
+            # Turning the lookup off sends every row to the ensemble (other vitals miss the cache)
+            predictor.exact_match_min_support = None
+            result = predictor.predict_disease({'symptoms': ['fever'], 'age': 70})
+            assert result['answered_by'] == 'ensemble' and result['predicted_disease'] == 'Flu'
+        
+        print("✅ Exact match index: weighted distributions, support gating and ensemble hand-off")
+        return True
+    except Exception as e:
+        print(f"❌ Exact match index error: {e}")
+        return False
+    finally:
+        os.chdir(cwd)
+
+def test_background_training():
+    """Test that requests get fallback answers while models train in the background"""
+    cwd = os.getcwd()
+    try:
+        import tempfile
+        from disease_predictor import DiseasePredictor
+        
+        user_data = {'age': 30, 'bmi': 24.2, 'temperature': 37.2, 'symptoms': ['fever', 'cough']}
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            # No saved models here, so training starts in the background
+            os.chdir(tmp_dir)
+            predictor = DiseasePredictor(background_training=True)
+            
+            during = predictor.predict_disease(user_data)
+            assert predictor.wait_for_training(timeout=300), "Training did not finish"
+            status = predictor.get_training_status()
+            after = predictor.predict_disease(user_data)
+            
+            assert during['answered_by'] in ('fallback', 'naive_bayes') or status['state'] == 'ready', \
+                "Request waited on training"
+            assert status['state'] == 'ready' and status['progress'] == 1.0, f"Unexpected status {status}"
+            assert after['answered_by'] not in ('fallback', 'naive_bayes'), "Trained models not swapped in"
+            assert predictor.model_version is not None, "Trained models not saved as a bundle"
+        
+        print(f"✅ Background training: served '{during['answered_by']}' while training, then '{after['answered_by']}'")
+        return True
+    except Exception as e:
+        print(f"❌ Background training error: {e}")
+        return False
+    finally:
+        os.chdir(cwd)
+
+def test_training_checkpoint():
+    """Test that training resumes from the members a previous run checkpointed"""
+    cwd = os.getcwd()
+    try:
+        import shutil
+        import tempfile
+        from disease_predictor import DiseasePredictor
+        from training_checkpoint import CHECKPOINT_DIR
+        
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            os.chdir(tmp_dir)
+            # A file in place of the artifacts directory makes saving the bundle fail, as if
+            # training was interrupted before it was written
+            open('model_artifacts', 'w').close()
+            first = DiseasePredictor()
+            assert not any(report['resumed'] for report in first.training_report.values())
+            
+            os.remove('model_artifacts')
+            second = DiseasePredictor()
+            assert all(report['resumed'] for report in second.training_report.values()), "Members refitted"
+            for name, report in second.training_report.items():
+                assert report['accuracy'] == first.training_report[name]['accuracy'], f"{name} differs"
+            
+            # Once the bundle is saved the checkpoints are gone, so a deliberate retrain refits
+            assert not os.listdir(CHECKPOINT_DIR), "Checkpoints kept after the bundle was saved"
+            shutil.rmtree('model_artifacts')
+            third = DiseasePredictor()
+            assert not any(report['resumed'] for report in third.training_report.values()), "Stale members restored"
+        
+        print(f"✅ Training checkpoint: {len(second.training_report)} members resumed without refitting")
+        return True
+    except Exception as e:
+        print(f"❌ Training checkpoint error: {e}")
+        return False
+    finally:
+        os.chdir(cwd)
+
+def test_streaming_training():
+    """Test out-of-core training of the incremental members over CSV chunks"""
+    cwd = os.getcwd()
+    try:
+        import tempfile
+        import numpy as np
+        import disease_predictor
+        from data_processor import SYMPTOMS_DATA_FILE
+        from disease_predictor import DiseasePredictor
+        
+        rng = np.random.default_rng(42)
+        symptoms = ['fever', 'cough', 'headache', 'fatigue', 'nausea', 'rash', 'chills', 'vomiting',
+                    'dizziness', 'itching']
+        patterns = {'Flu': [0, 1, 3], 'Migraine': [2, 4], 'Measles': [0, 5], 'Malaria': [0, 6, 7],
+                    'Vertigo': [4, 8], 'Allergy': [5, 9], 'Bronchitis': [1, 3, 6], 'Gastritis': [3, 4, 7]}
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            os.chdir(tmp_dir)
+            # Sorted by disease, so every chunk holds a single disease
+            with open(SYMPTOMS_DATA_FILE, 'w') as f:
+                f.write("diseases," + ",".join(symptoms) + "\n")
+                for disease in patterns:
+                    for _ in range(80):
+                        row = (rng.random(len(symptoms)) < 0.05).astype(int)
+                        row[patterns[disease]] = 1
+                        f.write(disease + "," + ",".join(map(str, row)) + "\n")
+            
+            # A small hold-out cap: the reservoir keeps 10 of the 32 rows that make up 5%
+            holdout_max_rows = disease_predictor.STREAMING_HOLDOUT_MAX_ROWS
+            disease_predictor.STREAMING_HOLDOUT_MAX_ROWS = 10
+            try:
+                predictor = DiseasePredictor(training_mode='streaming', streaming_chunksize=40,
+                                             streaming_shuffle_chunks=8)
+            finally:
+                disease_predictor.STREAMING_HOLDOUT_MAX_ROWS = holdout_max_rows
+            result = predictor.predict_disease({'symptoms': ['headache', 'nausea']})
+        
+        assert predictor.training_report['SGD']['streamed_rows'] == 630, \
+            f"Streamed {predictor.training_report['SGD']['streamed_rows']} of the 630 non-hold-out rows"
+        assert set(predictor.disease_info) == set(patterns), "Disease information not built"
+        assert 'nausea' in predictor.disease_info['Migraine']['symptoms']
+
+        assert set(predictor.models) == {'SGD', 'NaiveBayes', 'KernelApprox'}, "Unexpected streaming members"
+        assert all(report['accuracy'] > 0.9 for report in predictor.training_report.values()), \
+            f"Low hold-out accuracy: {predictor.training_report}"
+        assert result['predicted_disease'] == 'Migraine', f"Predicted {result['predicted_disease']}"
+        
+        rows = predictor.training_report['SGD']['streamed_rows']
+        print(f"✅ Streaming training: {rows} disease-sorted rows streamed in chunks of 40")
+        return True
+    except Exception as e:
+        print(f"❌ Streaming training error: {e}")
+        return False
+    finally:
+        os.chdir(cwd)
+
+def test_deduplication():
+    """Test collapsing duplicate training rows into weights and the leakage-free split"""
+    try:
+        import numpy as np
+        from scipy import sparse
+        from sklearn.preprocessing import LabelEncoder
+        from data_processor import DataProcessor
+        from disease_predictor import DiseasePredictor
+        
+        processor = DataProcessor()
+        processor.label_encoders['diseases'] = LabelEncoder().fit(['Cold', 'Flu'])
+        vectors = np.array([[1, 0, 1, 0, 0], [0, 1, 0, 0, 1], [1, 1, 0, 0, 0], [0, 0, 1, 1, 0]] * 10)
+        X = sparse.csr_matrix(np.vstack([vectors, vectors[:1]]))
+        y = np.array([0, 1, 0, 1] * 10 + [1])
+        
+        X_unique, y_unique, counts = processor.deduplicate_rows(X, y)
+        assert X_unique.shape[0] == 5 and counts.sum() == 41, f"Unexpected unique rows {counts}"
+        assert counts.tolist() == [10, 10, 10, 10, 1], f"Unexpected counts {counts}"
+        assert processor.dedup_report['unique_vectors'] == 4, "Vector groups not counted"
+        
+        predictor = DiseasePredictor()
+        X_train, X_test, y_train, y_test, w_train, w_test = predictor.split_training_data(
+            X_unique, y_unique, counts, processor.training_groups
+        )
+        train_vectors = {row.tobytes() for row in X_train.toarray()}
+        assert not any(row.tobytes() in train_vectors for row in X_test.toarray()), "Vector on both sides"
+        assert w_train.sum() + w_test.sum() == 41, "Weights lost in the split"
+        
+        print(f"✅ Deduplication: 41 rows collapsed into 5 (ratio {processor.dedup_report['duplication_ratio']:.1f})")
+        return True
+    except Exception as e:
+        print(f"❌ Deduplication error: {e}")
+        return False
+
+def test_feature_selection():
+    """Test support-based symptom pruning with rare symptoms merged into one column"""
+    try:
+        import numpy as np
+        from data_processor import DataProcessor, MERGED_SYMPTOM_COLUMN
+        from symptom_encoder import SymptomEncoder
+        
+        processor = DataProcessor()
+        support = dict(zip(processor.get_symptom_columns(), processor.get_symptom_support()))
+        columns = processor.select_symptom_columns(min_support=0.5, merge_rare=True)
+        
+        rare = [symptom for symptom, value in support.items() if value < 0.5]
+        assert columns == [s for s in support if s not in rare] + [MERGED_SYMPTOM_COLUMN], f"Unexpected {columns}"
+        
+        X, _ = processor.prepare_training_data(sparse_features=True)
+        assert X.shape[1] == len(columns), "Training matrix not reduced"
+        rare_rows = processor.get_symptom_matrix()[:, [processor.get_symptom_columns().index(s) for s in rare]]
+        assert np.array_equal(X[:, -1].toarray().ravel(), np.asarray(rare_rows.sum(axis=1)).ravel() > 0), \
+            "Merged column is not the OR of the rare symptoms"
+        
+        encoder = SymptomEncoder(columns, processor.get_feature_aliases())
+        assert encoder.encode({'symptoms': [rare[0]]}).tolist() == [len(columns) - 1], "Rare symptom not aliased"
+        
+        mutual_information = processor.get_symptom_mutual_information()
+        assert mutual_information.shape == (len(support),) and (mutual_information >= -1e-12).all()
+        assert len(processor.select_symptom_columns(top_k=2, method='mutual_info')) == 2
+        
+        print(f"✅ Feature selection: {len(support)} symptoms reduced to {len(columns)} columns")
+        return True
+    except Exception as e:
+        print(f"❌ Feature selection error: {e}")
+        return False
+
+def test_prediction_cache():
+    """Test LRU eviction, expiry and counters of the prediction cache"""
+    try:
+        import time
+        from prediction_cache import PredictionCache
+        
+        cache = PredictionCache(maxsize=2, ttl=0.05)
+        cache.put('a', 1)
+        cache.put('b', 2)
+        assert cache.get('a') == 1, "Cached value not returned"
+        cache.put('c', 3)
+        assert cache.get('b') is None, "Least recently used entry not evicted"
+        time.sleep(0.1)
+        assert cache.get('a') is None, "Expired entry returned"
+        
+        stats = cache.get_stats()
+        assert (stats['hits'], stats['misses'], stats['evictions'], stats['expirations']) == (1, 2, 1, 1), \
+            f"Unexpected counters: {stats}"
+        
+        print(f"✅ Prediction cache: {stats['hits']} hit, {stats['misses']} misses, {stats['evictions']} eviction")
+        return True
+    except Exception as e:
+        print(f"❌ Prediction cache error: {e}")
+        return False
+
+def test_symptom_encoder():
+    """Test bitset encoding of symptom sets"""
+    try:
+        import numpy as np
+        from symptom_encoder import SymptomEncoder
+        
+        columns = ['fever', 'cough', 'headache', 'fatigue', 'sore_throat', 'Chills', 'nausea', 'rash', 'dizziness']
+        encoder = SymptomEncoder(columns)
+        
+        indices = encoder.encode({'symptoms': ['cough', 'dizziness', 'unknown'], 'additional_symptoms': 'chills, RASH'})
+        assert indices.tolist() == [1, 5, 7, 8], f"Wrong columns: {indices.tolist()}"
+        
+        bitset = encoder.pack(indices)
+        assert bitset == np.packbits(encoder.to_dense(indices).astype(bool)).tobytes(), "Bitset layout differs from packbits"
+        assert encoder.unpack(bitset).tolist() == indices.tolist(), "Bitset does not round-trip"
+        assert encoder.to_csr([indices]).toarray()[0].tolist() == encoder.to_dense(indices).tolist(), "CSR row differs"
+        
+        similarity = encoder.jaccard_similarity(bitset, encoder.pack_matrix(np.eye(len(columns))[[1, 2]]))
+        assert similarity.tolist() == [0.25, 0.0], f"Wrong similarity: {similarity.tolist()}"
+        
+        print(f"✅ Symptom encoder: {len(indices)} symptoms packed into {len(bitset)} bytes")
+        return True
+    except Exception as e:
+        print(f"❌ Symptom encoder error: {e}")
+        return False
+
+def test_compiled_trees():
+    """Test that compiled tree engines reproduce sklearn probabilities exactly"""
+    try:
+        import numpy as np
+        from sklearn.ensemble import RandomForestClassifier, GradientBoostingClassifier
+        from tree_engine import CompiledTreeEnsemble
+        
+        rng = np.random.default_rng(42)
+        X = (rng.random((300, 20)) < 0.3).astype(float)
+        y = (X[:, 0] + X[:, 1] * 2 + rng.integers(0, 2, 300)).astype(int)
+        X_new = (rng.random((50, 20)) < 0.3).astype(float)
+        
+        for model in [RandomForestClassifier(n_estimators=20, random_state=42),
+                      GradientBoostingClassifier(n_estimators=20, random_state=42)]:
+            model.fit(X, y)
+            engine = CompiledTreeEnsemble.compile(model)
+            assert np.array_equal(model.predict_proba(X_new), engine.predict_proba(X_new)), \
+                f"{type(model).__name__} probabilities differ"
+        
+        print("✅ Compiled trees: RandomForest and GradientBoosting probabilities are identical")
+        return True
+    except Exception as e:
+        print(f"❌ Compiled trees error: {e}")
+        return False
+
+def test_lightgbm_member():
+    """Test that the LightGBM member fits sparse symptoms with early stopping"""
+    try:
+        import numpy as np
+        from scipy import sparse
+        from disease_predictor import ENSEMBLE_MEMBER_FACTORIES, fit_ensemble_member
+        
+        try:
+            import lightgbm  # noqa: F401
+        except ImportError:
+            print("⚠️  LightGBM member: lightgbm is not installed, skipping")
+            return True
+        
+        rng = np.random.default_rng(42)
+        X = sparse.csr_matrix(rng.random((600, 30)) < 0.2)
+        y = (X[:, 0].toarray().ravel() + X[:, 1].toarray().ravel() * 2).astype(int)
+        y[0] = 9  # a disease with a single row must stay in the fitting rows
+        weights = rng.integers(1, 4, 600).astype(float)
+        
+        model = ENSEMBLE_MEMBER_FACTORIES['lightgbm'](1)
+        _, model, score, _, _ = fit_ensemble_member('LightGBM', model, X[:500], y[:500], X[500:], y[500:],
+                                                    sample_weight=weights[:500], test_weight=weights[500:])
+        booster = model.steps[-1][1]
+        assert booster.best_iteration_ < booster.n_estimators, "Early stopping did not trigger"
+        assert 9 in model.classes_, "Single-row disease was dropped"
+        assert model.predict_proba(X[500:501]).shape == (1, len(model.classes_))
+        assert score > 0.9, f"Unexpected accuracy {score}"
+        
+        print(f"✅ LightGBM member: stopped after {booster.best_iteration_} rounds, accuracy {score:.3f}")
+        return True
+    except Exception as e:
+        print(f"❌ LightGBM member error: {e}")
+        return False
+
+def test_naive_bayes_engine():
+    """Test the count-table naive Bayes engine and its use as the fallback"""
+    cwd = os.getcwd()
+    try:
+        import tempfile
+        import numpy as np
+        from scipy import sparse
+        from sklearn.naive_bayes import BernoulliNB
+        from data_processor import DataProcessor
+        from disease_predictor import DiseasePredictor, NaiveBayesEngine
+        
+        rng = np.random.default_rng(42)
+        columns = [f"symptom_{i}" for i in range(25)]
+        profiles = rng.random((6, 25)) ** 3
+        y = rng.integers(0, 6, 900).astype(str)
+        X = sparse.csr_matrix(rng.random((900, 25)) < profiles[y.astype(int)])
+        
+        # The count tables give exactly sklearn's Bernoulli naive Bayes posteriors
+        engine = NaiveBayesEngine.from_rows(X, y, columns)
+        reference = BernoulliNB(alpha=1.0).fit(X, y)
+        order = [list(reference.classes_).index(disease) for disease in engine.diseases]
+        assert np.allclose(engine.predict_proba(X[:50]), reference.predict_proba(X[:50])[:, order])
+        
+        # Incremental updates, including a new disease, match a rebuild from all rows
+        updated = NaiveBayesEngine.from_rows(X[:600], y[:600], columns)
+        updated.update(X[600:800], y[600:800])
+        updated.update(X[800:], np.where(y[800:] == '0', 'new_disease', y[800:]))
+        rebuilt = NaiveBayesEngine.from_rows(X, np.concatenate([y[:800], np.where(y[800:] == '0', 'new_disease', y[800:])]),
+                                             columns)
+        order = [rebuilt.diseases.index(disease) for disease in updated.diseases]
+        assert np.allclose(updated.predict_proba(X[:50]), rebuilt.predict_proba(X[:50])[:, order]), \
+            "Incremental update differs from a rebuild"
+        
+        ranked = engine.predict_patient({'symptoms': columns[:3]})
+        assert ranked[0][1] >= ranked[1][1], "Diseases not ranked by probability"
+        
+        # Without trained models the predictor answers from the engine instead of the rules
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            os.chdir(tmp_dir)
+            data_processor = DataProcessor()
+            predictor = DiseasePredictor(background_training=True, data_processor=data_processor)
+            predictor.wait_for_training(timeout=300)
+            result = predictor.get_fallback_prediction({'symptoms': ['fever', 'cough'], 'temperature': 39.0})
+            assert result['answered_by'] == 'naive_bayes', f"Answered by {result['answered_by']}"
+            assert result['predicted_disease'] in data_processor.profile_diseases
+        
+        print(f"✅ Naive Bayes engine: matches BernoulliNB, fallback predicted {result['predicted_disease']}")
+        return True
+    except Exception as e:
+        print(f"❌ Naive Bayes engine error: {e}")
+        return False
+    finally:
+        os.chdir(cwd)
+
+def test_symptom_questioner():
+    """Test that follow-up questions are ranked by exact expected information gain"""
+    try:
+        import time
+        import numpy as np
+        from symptom_questioner import SymptomQuestioner
+        
+        rng = np.random.default_rng(42)
+        n_diseases, n_symptoms = 700, 380
+        row_counts = rng.integers(50, 300, n_diseases)
+        symptom_counts = (rng.random((n_diseases, n_symptoms)) < 0.05) * rng.integers(0, 50, (n_diseases, n_symptoms))
+        columns = [f"symptom_{i}" for i in range(n_symptoms)]
+        questioner = SymptomQuestioner.from_counts([f"disease_{i}" for i in range(n_diseases)], columns,
+                                                   symptom_counts, row_counts)
+        
+        start = time.perf_counter()
+        suggestions = questioner.suggest(columns[:3], denied_symptoms=columns[3:5], top_k=5)
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        
+        suggested = [suggestion['symptom'] for suggestion in suggestions]
+        assert len(suggested) == 5 and not set(suggested) & set(columns[:5]), "Answered symptoms suggested again"
+        assert elapsed_ms < 50, f"Ranking took {elapsed_ms:.1f}ms"
+        
+        # Compare with the entropy of the posterior before and after each possible answer
+        def entropy(p):
+            p = p[p > 0] / p.sum()
+            return -(p * np.log2(p)).sum()
+        
+        posterior = questioner.posterior(np.arange(3), np.arange(3, 5))
+        probabilities = questioner.symptom_probabilities
+        gains = []
+        for suggestion in suggestions:
+            j = columns.index(suggestion['symptom'])
+            yes, no = posterior * probabilities[:, j], posterior * (1 - probabilities[:, j])
+            expected = yes.sum() * entropy(yes) + no.sum() * entropy(no)
+            assert np.isclose(suggestion['information_gain'], entropy(posterior) - expected), \
+                f"Wrong information gain for {suggestion['symptom']}"
+            gains.append(suggestion['information_gain'])
+        assert gains == sorted(gains, reverse=True), "Suggestions not ranked by information gain"
+        
+        # The tables are the naive Bayes engine's, not a copy, and P is its smoothed estimate
+        engine = questioner.engine
+        assert questioner.get_tables()[0] is engine.tables, "Engine tables copied"
+        assert np.allclose(probabilities, (symptom_counts + 1) / (row_counts[:, np.newaxis] + 2))
+        # With every symptom answered the posterior is the engine's
+        answers = (rng.random(n_symptoms) < 0.05).astype(float)
+        assert np.allclose(questioner.posterior(np.flatnonzero(answers), np.flatnonzero(answers == 0)),
+                           engine.predict_proba(answers[np.newaxis])[0]), "Posterior differs from naive Bayes"
+        
+        # Updating the engine updates the questions
+        engine.update(np.ones((500, n_symptoms)), ['disease_0'] * 500)
+        assert questioner.get_tables()[0] is engine.tables, "Questioner kept the old tables"
+        assert np.allclose(questioner.symptom_probabilities[0],
+                           (symptom_counts[0] + 501) / (row_counts[0] + 502)), "Probabilities not rebuilt"
+        
+        print(f"✅ Symptom questioner: ranked {n_symptoms} symptoms in {elapsed_ms:.2f}ms")
+        return True
+    except Exception as e:
+        print(f"❌ Symptom questioner error: {e}")
+        return False
+
+def test_model_bundle():
+    """Test that a saved model bundle loads lazily and pins its features and labels"""
+    try:
+        import tempfile
+        import numpy as np
+        from sklearn.ensemble import RandomForestClassifier
+        from sklearn.linear_model import LogisticRegression
+        from sklearn.preprocessing import LabelEncoder
+        from model_store import ModelBundle, save_bundle, load_current_bundle
+        
+        rng = np.random.default_rng(42)
+        X = (rng.random((200, 10)) < 0.3).astype(float)
+        y = (X[:, 0] + X[:, 1] * 2).astype(int)
+        models = {
+            'RandomForest': RandomForestClassifier(n_estimators=10, random_state=42).fit(X, y),
+            'LogisticRegression': LogisticRegression(max_iter=1000).fit(X, y)
+        }
+        label_encoder = LabelEncoder().fit(['Flu', 'Cold', 'Covid', 'Migraine'])
+        columns = [f"symptom_{i}" for i in range(10)]
+        
+        with tempfile.TemporaryDirectory() as root:
+            save_bundle(models, columns, label_encoder, root=root)
+            bundle = load_current_bundle(root, verify=True)
+            
+            assert bundle.feature_columns == columns, "Feature columns not pinned"
+            assert list(bundle.label_encoder.inverse_transform([0, 3])) == ['Cold', 'Migraine']
+            assert bundle.models.loaded_names() == [], "Models loaded before first use"
+            assert np.array_equal(bundle.models['RandomForest'].predict_proba(X),
+                                  models['RandomForest'].predict_proba(X)), "Reloaded model differs"
+            assert bundle.models.loaded_names() == ['RandomForest'], "Unused model was loaded"
+            
+            with open(f"{bundle.directory}/LogisticRegression.joblib", 'ab') as f:
+                f.write(b'tampered')
+            assert not ModelBundle.load(bundle.directory).verify(), "Tampered file not detected"
+        
+        print("✅ Model bundle: lazy loading, pinned manifest and content hashes work")
+        return True
+    except Exception as e:
+        print(f"❌ Model bundle error: {e}")
+        return False
+
+def test_model_registry():
+    """Test hot-swapping a new model version and rolling it back"""
+    cwd = os.getcwd()
+    try:
+        import tempfile
+        import threading
+        import time
+        import numpy as np
+        from sklearn.linear_model import LogisticRegression
+        from sklearn.preprocessing import LabelEncoder
+        from disease_predictor import DiseasePredictor
+        from model_store import save_bundle, get_current_version, set_current_version
+        from model_registry import ModelRegistry
+        
+        rng = np.random.default_rng(42)
+        columns = ['fever', 'cough', 'headache', 'fatigue']
+        X = (rng.random((100, 4)) < 0.5).astype(float)
+        label_encoder = LabelEncoder().fit(['Cold', 'Flu', 'Migraine'])
+        user_data = {'age': 30, 'symptoms': ['fever', 'cough']}
+        
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            os.chdir(tmp_dir)
+            old_dir = save_bundle({'LogisticRegression': LogisticRegression().fit(X, rng.integers(0, 3, 100))},
+                                  columns, label_encoder)
+            predictor = DiseasePredictor(exact_match_min_support=None)
+            registry = ModelRegistry(predictor)
+            old_version = predictor.model_version
+            assert predictor.predict_disease(user_data)['model_version'] == old_version
+            
+            new_dir = save_bundle({'LogisticRegression': LogisticRegression().fit(X, X[:, 0] + X[:, 1])},
+                                  columns, label_encoder)
+            new_version = os.path.basename(new_dir)
+            assert registry.check_for_update(), "New version not picked up"
+            assert predictor.predict_disease(user_data)['model_version'] == new_version, "Version not swapped"
+            
+            registry.rollback()
+            assert predictor.model_version == old_version == os.path.basename(old_dir), "Rollback failed"
+            assert get_current_version() == old_version, "CURRENT not pointed back"
+            assert not registry.check_for_update(), "Rolled back version re-activated"
+            assert predictor.get_cache_stats()['model_version'] == old_version
+            
+            # A bundle that fails verification is rejected instead of re-hashed on every poll
+            broken_dir = save_bundle({'LogisticRegression': LogisticRegression().fit(X, X[:, 2])},
+                                     columns, label_encoder)
+            with open(os.path.join(broken_dir, 'LogisticRegression.joblib'), 'ab') as f:
+                f.write(b'corrupt')
+            try:
+                registry.check_for_update()
+                raise AssertionError("Broken version activated")
+            except ValueError:
+                pass
+            assert os.path.basename(broken_dir) in registry.rejected_versions, "Broken version not rejected"
+            assert not registry.check_for_update(), "Broken version retried"
+            
+            # A slow load of another version does not hold up a rollback, and is dropped after it
+            slow_dir = save_bundle({'LogisticRegression': LogisticRegression().fit(X, X[:, 3])},
+                                   columns, label_encoder)
+            preload = registry.preload
+            registry.preload = lambda version: (time.sleep(1.0), preload(version))[1]
+            loader = threading.Thread(target=registry.check_for_update)
+            loader.start()
+            time.sleep(0.2)
+            start = time.perf_counter()
+            rolled_back_to = registry.rollback()
+            rollback_seconds = time.perf_counter() - start
+            loader.join()
+            assert rollback_seconds < 0.5, f"Rollback waited {rollback_seconds:.2f}s for the load"
+            assert predictor.model_version == rolled_back_to == get_current_version(), \
+                f"Serving {predictor.model_version} after rolling back to {rolled_back_to}"
+            assert registry.history[-1]['event'] == 'superseded'
+            assert registry.history[-1]['version'] == os.path.basename(slow_dir)
+            assert not registry.check_for_update(), "Serving version flipped after the rollback"
+            
+            # So is a watcher load whose version CURRENT stops naming meanwhile
+            save_bundle({'LogisticRegression': LogisticRegression().fit(X, X[:, 0])}, columns, label_encoder)
+            loader = threading.Thread(target=registry.check_for_update)
+            loader.start()
+            time.sleep(0.2)
+            set_current_version(rolled_back_to)
+            loader.join()
+            assert predictor.model_version == rolled_back_to, f"Serving {predictor.model_version}"
+        
+        print(f"✅ Model registry: swapped to {new_version} and rolled back to {old_version}")
+        return True
+    except Exception as e:
+        print(f"❌ Model registry error: {e}")
+        return False
+    finally:
+        os.chdir(cwd)
+
 def test_recommendation_system():
     """Test RecommendationSystem functionality"""
     try:
@@ -145,7 +1119,30 @@ def main():
     tests = [
         ("Module Imports", test_imports),
         ("Data Processor", test_data_processor),
+        ("Symptom Matrix Loader", test_symptom_matrix_loader),
+        ("Data Cache", test_data_cache),
+        ("Sample Data Fallback", test_sample_data_fallback),
+        ("Disease Profiles", test_disease_profiles),
+        ("Symptom Scoring", test_symptom_scoring),
         ("Disease Predictor", test_disease_predictor),
+        ("Batch Prediction", test_batch_prediction),
+        ("Soft Voting", test_soft_voting),
+        ("Predictor Cache", test_predictor_cache),
+        ("Cascade Voting", test_cascade_voting),
+        ("Exact Match Index", test_exact_match_index),
+        ("Background Training", test_background_training),
+        ("Training Checkpoint", test_training_checkpoint),
+        ("Streaming Training", test_streaming_training),
+        ("Deduplication", test_deduplication),
+        ("Feature Selection", test_feature_selection),
+        ("Prediction Cache", test_prediction_cache),
+        ("Symptom Encoder", test_symptom_encoder),
+        ("Compiled Trees", test_compiled_trees),
+        ("LightGBM Member", test_lightgbm_member),
+        ("Naive Bayes Engine", test_naive_bayes_engine),
+        ("Symptom Questioner", test_symptom_questioner),
+        ("Model Bundle", test_model_bundle),
+        ("Model Registry", test_model_registry),
         ("Recommendation System", test_recommendation_system),
         ("Routine Generator", test_routine_generator),
         ("Visualization", test_visualization)
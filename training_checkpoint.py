@@ -0,0 +1,88 @@
+import os
+import shutil
+from importlib import metadata
+
+import joblib
+
+CHECKPOINT_DIR = '.training_checkpoints'
+# Libraries whose upgrade invalidates pickled members
+CHECKPOINT_LIBRARIES = ('numpy', 'scipy', 'scikit-learn', 'joblib', 'lightgbm')
+
+def library_versions():
+    """Installed versions of the libraries fitted members depend on"""
+    versions = {}
+    for name in CHECKPOINT_LIBRARIES:
+        try:
+            versions[name] = metadata.version(name)
+        except metadata.PackageNotFoundError:
+            versions[name] = None
+    return versions
+
+def save_checkpoint(path, obj):
+    """Dump an object atomically, so an interrupted write never looks like a checkpoint"""
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    joblib.dump(obj, tmp_path)
+    os.replace(tmp_path, path)
+
+class TrainingCheckpoint:
+    """On-disk stages of one training run: the train/test split and every fitted member
+
+    Stages are keyed by a hash of the training data and the library versions, so a
+    restart on the same data resumes where the previous run stopped, while changed data
+    or upgraded libraries start over. A completed run clears its stages.
+    """
+
+    def __init__(self, root, data_key):
+        self.root = root
+        self.data_key = data_key
+        self.directory = os.path.join(root, data_key)
+        os.makedirs(os.path.join(self.directory, 'members'), exist_ok=True)
+
+    @classmethod
+    def for_data(cls, root, X, y, symptom_columns, **split_params):
+        """Open the checkpoint of this training data, dropping those of older data"""
+        data_key = joblib.hash((X, y, list(symptom_columns), sorted(split_params.items()),
+                                sorted(library_versions().items())))
+        if os.path.isdir(root):
+            for name in os.listdir(root):
+                if name != data_key:
+                    shutil.rmtree(os.path.join(root, name), ignore_errors=True)
+        return cls(root, data_key)
+
+    def clear(self):
+        """Delete this run's stages once its models are saved"""
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    @property
+    def split_path(self):
+        return os.path.join(self.directory, 'split.joblib')
+
+    def load_split(self):
+        """Load the cached split memory-mapped, or None if the data-prep stage has not run"""
+        if not os.path.exists(self.split_path):
+            return None
+        try:
+            return joblib.load(self.split_path, mmap_mode='r')
+        except Exception as e:
+            print(f"Ignoring unreadable split checkpoint: {e}")
+            return None
+
+    def save_split(self, *split):
+        """Persist the train/test split arrays and return them memory-mapped"""
+        save_checkpoint(self.split_path, tuple(split))
+        return self.load_split()
+
+    def member_path(self, name, model):
+        """Checkpoint path of a member, keyed by its name and unfitted parameters"""
+        return os.path.join(self.directory, 'members', f"{name}-{joblib.hash(model)}.joblib")
+
+    def load_member(self, name, model):
+        """Load a member fitted by an earlier run, or None"""
+        path = self.member_path(name, model)
+        if not os.path.exists(path):
+            return None
+        try:
+            return joblib.load(path)
+        except Exception as e:
+            print(f"Ignoring unreadable checkpoint of {name}: {e}")
+            return None
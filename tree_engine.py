@@ -0,0 +1,204 @@
+#!/usr/bin/env python3
+"""
+Flattened-array inference for the tree ensembles in disease_models.pkl
+RandomForest and GradientBoosting members are compiled into contiguous NumPy node
+arrays and evaluated with a vectorized traversal, without sklearn's per-call overhead
+"""
+
+import json
+import os
+import numpy as np
+import sklearn
+from scipy import sparse
+from scipy.special import expit
+from sklearn.ensemble import RandomForestClassifier, GradientBoostingClassifier
+from sklearn.utils.extmath import softmax
+from sklearn.utils.fixes import parse_version
+
+ARRAY_NAMES = ['feature', 'threshold', 'left', 'right', 'leaf_index', 'leaf_values', 'roots']
+BATCH_ROWS = 4096
+
+# Before scikit-learn 1.4 tree leaves held class counts that predict_proba normalized
+LEAVES_HOLD_COUNTS = parse_version(sklearn.__version__) < parse_version('1.4')
+
+class CompiledTreeEnsemble:
+    """A tree ensemble stored as flat node arrays
+
+    All trees share one set of node arrays; roots holds the first node of each tree.
+    Leaves point to themselves, so every row can be advanced max_depth times at once.
+    """
+
+    def __init__(self, arrays, meta):
+        self.arrays = arrays
+        self.meta = meta
+        self.classes_ = np.asarray(meta['classes'])
+        for name in ARRAY_NAMES:
+            setattr(self, name, arrays[name])
+        self.init_raw = arrays.get('init_raw')
+
+    @classmethod
+    def compile(cls, model):
+        """Compile a fitted RandomForestClassifier or GradientBoostingClassifier"""
+        if isinstance(model, RandomForestClassifier):
+            trees = [estimator.tree_ for estimator in model.estimators_]
+            meta = {'kind': 'random_forest', 'n_classes': int(model.n_classes_)}
+        elif isinstance(model, GradientBoostingClassifier):
+            if model.init_ != 'zero' and not hasattr(model.init_, 'strategy'):
+                raise ValueError("Only zero or prior init estimators can be compiled")
+            trees = [estimator.tree_ for estimator in model.estimators_.ravel()]
+            meta = {
+                'kind': 'gradient_boosting',
+                'n_classes': int(model.n_classes_),
+                'trees_per_stage': int(model.estimators_.shape[1]),
+                'learning_rate': float(model.learning_rate)
+            }
+        else:
+            raise TypeError(f"Cannot compile {type(model).__name__}")
+
+        meta['classes'] = model.classes_.tolist()
+        meta['n_features'] = int(model.n_features_in_)
+        meta['max_depth'] = int(max(tree.max_depth for tree in trees))
+
+        feature, threshold, left, right, leaf_index, leaf_values, roots = [], [], [], [], [], [], []
+        offset = 0
+        n_leaves = 0
+        for tree in trees:
+            is_leaf = tree.children_left == -1
+            nodes = np.arange(tree.node_count)
+
+            roots.append(offset)
+            feature.append(np.where(is_leaf, 0, tree.feature))
+            threshold.append(tree.threshold)
+            left.append(np.where(is_leaf, nodes, tree.children_left) + offset)
+            right.append(np.where(is_leaf, nodes, tree.children_right) + offset)
+
+            index = np.full(tree.node_count, -1, dtype=np.int64)
+            index[is_leaf] = np.arange(is_leaf.sum()) + n_leaves
+            leaf_index.append(index)
+
+            if meta['kind'] == 'random_forest':
+                values = tree.value[is_leaf, 0, :meta['n_classes']].astype(np.float64)
+                if LEAVES_HOLD_COUNTS:
+                    normalizer = values.sum(axis=1)[:, np.newaxis]
+                    normalizer[normalizer == 0.0] = 1.0
+                    values /= normalizer
+            else:
+                values = tree.value[is_leaf, 0, 0].astype(np.float64)
+            leaf_values.append(values)
+
+            offset += tree.node_count
+            n_leaves += int(is_leaf.sum())
+
+        arrays = {
+            'feature': np.concatenate(feature).astype(np.int64),
+            'threshold': np.concatenate(threshold).astype(np.float64),
+            'left': np.concatenate(left).astype(np.int64),
+            'right': np.concatenate(right).astype(np.int64),
+            'leaf_index': np.concatenate(leaf_index),
+            'leaf_values': np.ascontiguousarray(np.concatenate(leaf_values)),
+            'roots': np.array(roots, dtype=np.int64)
+        }
+
+        if meta['kind'] == 'gradient_boosting':
+            if model.init_ == 'zero':
+                arrays['init_raw'] = np.zeros(meta['trees_per_stage'])
+            else:
+                # The prior init estimator predicts the same raw score for every row
+                arrays['init_raw'] = model._raw_predict_init(
+                    np.zeros((1, meta['n_features']), dtype=np.float32)
+                )[0].copy()
+
+        return cls(arrays, meta)
+
+    def apply(self, X):
+        """Get the leaf reached in every tree, shape (n_rows, n_trees)"""
+        rows = np.arange(X.shape[0])[:, np.newaxis]
+        nodes = np.broadcast_to(self.roots, (X.shape[0], len(self.roots)))
+        for _ in range(self.meta['max_depth']):
+            go_left = X[rows, self.feature[nodes]] <= self.threshold[nodes]
+            nodes = np.where(go_left, self.left[nodes], self.right[nodes])
+        return self.leaf_index[nodes]
+
+    def predict_proba(self, X):
+        """Predict class probabilities, identical to the sklearn model's predict_proba"""
+        if sparse.issparse(X):
+            X = X.toarray()
+        X = np.asarray(X, dtype=np.float32)
+        if X.ndim == 1:
+            X = X[np.newaxis, :]
+
+        if X.shape[0] <= BATCH_ROWS:
+            return self.predict_proba_batch(X)
+        return np.vstack([
+            self.predict_proba_batch(X[start:start + BATCH_ROWS])
+            for start in range(0, X.shape[0], BATCH_ROWS)
+        ])
+
+    def predict_proba_batch(self, X):
+        """Predict one batch of dense float32 rows"""
+        leaves = self.apply(X)
+
+        if self.meta['kind'] == 'random_forest':
+            # Sum tree by tree in estimator order, like the forest does with n_jobs=1
+            proba = np.zeros((X.shape[0], self.meta['n_classes']))
+            for t in range(leaves.shape[1]):
+                proba += self.leaf_values[leaves[:, t]]
+            proba /= leaves.shape[1]
+            return proba
+
+        # Add each stage's scaled tree outputs in stage order, like predict_stages does
+        trees_per_stage = self.meta['trees_per_stage']
+        raw = np.tile(self.init_raw, (X.shape[0], 1))
+        for start in range(0, leaves.shape[1], trees_per_stage):
+            raw += self.meta['learning_rate'] * self.leaf_values[leaves[:, start:start + trees_per_stage]]
+
+        if trees_per_stage == 1:
+            proba = np.empty((X.shape[0], 2))
+            proba[:, 1] = expit(raw[:, 0])
+            proba[:, 0] = 1 - proba[:, 1]
+            return proba
+        return softmax(raw)
+
+    def predict(self, X):
+        """Predict class labels"""
+        return self.classes_[self.predict_proba(X).argmax(axis=1)]
+
+    def save(self, directory):
+        """Save the node arrays as .npy files so they can be memory-mapped on load"""
+        os.makedirs(directory, exist_ok=True)
+        for name, array in self.arrays.items():
+            np.save(os.path.join(directory, f"{name}.npy"), array)
+        with open(os.path.join(directory, 'meta.json'), 'w') as f:
+            json.dump(self.meta, f)
+
+    @classmethod
+    def load(cls, directory, mmap_mode='r'):
+        """Load a compiled ensemble, memory-mapping its node arrays"""
+        with open(os.path.join(directory, 'meta.json')) as f:
+            meta = json.load(f)
+        arrays = {}
+        for name in ARRAY_NAMES + ['init_raw']:
+            path = os.path.join(directory, f"{name}.npy")
+            if os.path.exists(path):
+                arrays[name] = np.load(path, mmap_mode=mmap_mode)
+        return cls(arrays, meta)
+
+def compile_tree_models(models):
+    """Compile every tree ensemble in a dict of models"""
+    return {
+        name: CompiledTreeEnsemble.compile(model)
+        for name, model in models.items()
+        if isinstance(model, (RandomForestClassifier, GradientBoostingClassifier))
+    }
+
+def export_compiled_models(models_path='disease_models.pkl', output_dir='compiled_models'):
+    """Compile the tree ensembles of a saved model file into node-array directories"""
+    import joblib
+    compiled = compile_tree_models(joblib.load(models_path))
+    for name, engine in compiled.items():
+        engine.save(os.path.join(output_dir, name))
+        print(f"✅ Compiled {name}: {len(engine.roots)} trees, {len(engine.feature)} nodes")
+    return compiled
+
+if __name__ == "__main__":
+    export_compiled_models()